@@ -0,0 +1,142 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# Compare the conversion of a synthetic notebook with a Pandoc process per
+# page and with pandoc-server.
+#
+#    python bench/pandocserver_bench.py --pages 500 --jobs 4 --servers 1
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import logging
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "siteexporter" ) )
+from pandocrunner import PandocRunner, PandocJob
+from pandocserver import PandocServerRunner
+
+pandoccmd = "pandoc"
+command = [ pandoccmd, "-f", "markdown+raw_html", "-t", "html5", "--standalone", "--section-divs" ]
+options = { "from": "markdown+raw_html", "to": "html5", "standalone": True, "section-divs": True }
+
+template = """<!DOCTYPE html>
+<html>
+<head><title>$sx.meta-title$</title></head>
+<body>
+<nav>
+$for(sx.navindex)$
+<a href="$sx.navindex.link$">$sx.navindex.display$</a>
+$endfor$
+</nav>
+<main>
+$body$
+</main>
+</body>
+</html>
+"""
+
+class SyntheticPage:
+    def __init__( self, id, lines ):
+        self.id = id
+        self.lines = lines
+
+    def getMarkdown( self ):
+        return self.lines
+
+
+def makePages( count, menuSize ):
+    navindex = [ "  - id: menu{0}\n    display: Menu {0}\n    link: menu{0}.html\n".format( i )
+            for i in range( menuSize ) ]
+    pages = []
+    for i in range( count ):
+        lines = [ "---\n", "sx:\n", "  meta-title: Page {}\n".format( i ), "  navindex:\n" ]
+        lines += navindex
+        lines += [ "---\n", "\n", "# Page {}\n".format( i ), "\n" ]
+        lines += [ "Paragraph {} with *some* text and a [link](page{}.html).\n\n".format( j, j )
+                for j in range( 10 ) ]
+        pages.append( SyntheticPage( "page{}".format( i ), lines ) )
+    return pages
+
+
+def makeJobs( pages, workdir, templateFn, outdir ):
+    jobs = []
+    for page in pages:
+        mkdpath = os.path.join( workdir, page.id + ".markdown" )
+        outpath = os.path.join( outdir, page.id + ".html" )
+        cmd = command + [ "--template", templateFn, "-o", outpath, mkdpath ]
+        job = PandocJob( page, cmd, outpath, template=templateFn, options=options )
+        job.sourcefile = mkdpath
+        jobs.append( job )
+    return jobs
+
+
+def timeRun( name, runner, jobs ):
+    start = time.time()
+    results = runner.run( jobs )
+    elapsed = time.time() - start
+    failed = len([ r for r in results if r.failed() ])
+    print( "{:<16} {:8.2f} s {:8.1f} ms/page  failed: {}".format(
+        name, elapsed, 1000.0 * elapsed / max( 1, len(jobs) ), failed ) )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description="Compare pandoc processes with pandoc-server on a synthetic notebook." )
+    parser.add_argument( "--pages", type=int, default=200 )
+    parser.add_argument( "--menu", type=int, default=30, help="The number of entries in navindex." )
+    parser.add_argument( "--jobs", type=int, default=1 )
+    parser.add_argument( "--servers", type=int, default=1 )
+    args = parser.parse_args()
+    logging.basicConfig()
+
+    workdir = tempfile.mkdtemp( prefix="sx-bench-" )
+    try:
+        pages = makePages( args.pages, args.menu )
+        for page in pages:
+            with open( os.path.join( workdir, page.id + ".markdown" ), "w" ) as f:
+                f.write( "".join( page.lines ) )
+        templateFn = os.path.join( workdir, "default.html5" )
+        with open( templateFn, "w" ) as f:
+            f.write( template )
+
+        print( "Pages: {}, jobs: {}, servers: {}".format( args.pages, args.jobs, args.servers ) )
+        runner = PandocRunner( args.jobs )
+        outdir = os.path.join( workdir, "process" )
+        os.makedirs( outdir )
+        timeRun( "pandoc process", runner, makeJobs( pages, workdir, templateFn, outdir ) )
+
+        servers = PandocServerRunner.startServers( pandoccmd, args.servers )
+        if len(servers) == 0:
+            print( "pandoc-server is not available." )
+            return 1
+        try:
+            outdir = os.path.join( workdir, "server" )
+            os.makedirs( outdir )
+            serverRunner = PandocServerRunner( servers, runner, args.jobs )
+            timeRun( "pandoc-server", serverRunner, makeJobs( pages, workdir, templateFn, outdir ) )
+        finally:
+            for server in servers:
+                server.stop()
+    finally:
+        shutil.rmtree( workdir )
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
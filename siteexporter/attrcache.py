@@ -0,0 +1,93 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from fileutil import writeFileAtomic
+from pageattributes import loadYamlAttributes, pageSourcePath, readPageHeaders, parseCreationDate
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.attrcache')
+
+
+class AttributeCache:
+    """The YAML attributes and creation dates of the pages from previous exports.
+
+    The entries are keyed by the path of the page source file and are valid
+    while the modification time and the size of the file do not change.  Pages
+    without a source file are not cached.  The entries that were not used in
+    an export are removed when the cache is saved.
+    """
+
+    version = 1
+
+    def __init__( self, filename ):
+        self.filename = filename
+        self.entries = {}
+        self.used = set() # The paths of the entries used in this export
+        self.modified = False
+
+    def load( self ):
+        if not os.path.exists( self.filename ):
+            return
+        try:
+            with open( self.filename, "rb" ) as f:
+                data = pickle.load( f )
+        except Exception as e:
+            logger.warning( "Invalid attribute cache '{}': {}".format( self.filename, e ) )
+            return
+        if data.get( "version" ) == AttributeCache.version:
+            self.entries = data.get( "entries", {} )
+
+    def save( self ):
+        unused = [ path for path in self.entries.keys() if not path in self.used ]
+        for path in unused:
+            del self.entries[path]
+        if not self.modified and len(unused) == 0:
+            return
+        data = { "version": AttributeCache.version, "entries": self.entries }
+        writeFileAtomic( self.filename,
+                lambda f: pickle.dump( data, f, pickle.HIGHEST_PROTOCOL ), binary=True )
+        self.modified = False
+
+    # Return the attributes and the creation date of a Zim page.
+    def loadAttributes( self, page ):
+        path = pageSourcePath( page )
+        if path is None:
+            return loadYamlAttributes( page ), None
+
+        self.used.add( path )
+        st = os.stat( path )
+        entry = self.entries.get( path )
+        if entry is not None and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+            return entry["attrs"], entry["created"]
+
+        attrs = loadYamlAttributes( page )
+        created = parseCreationDate( readPageHeaders( path ).get( "Creation-Date" ) )
+        self.entries[path] = { "mtime": st.st_mtime, "size": st.st_size,
+                "attrs": attrs, "created": created }
+        self.modified = True
+        return attrs, created
+
+
+def loadCachedAttributes( page, attrCache ):
+    if attrCache is None:
+        return loadYamlAttributes( page )
+    return attrCache.loadAttributes( page )[0]
@@ -0,0 +1,79 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from attrcache import AttributeCache
+
+class TestSource:
+    def __init__(self, path):
+        self.path = path
+
+class TestZimPage:
+    def __init__(self, path):
+        self.source_file = TestSource( path )
+
+class TestAttributeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cacheFn = os.path.join( self.tmpdir, "cache", "attributes.pickle" )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writePage(self, name, title):
+        fn = os.path.join( self.tmpdir, name + ".txt" )
+        with open( fn, "w" ) as f:
+            f.write( "Content-Type: text/x-zim-wiki\nCreation-Date: 2018-10-11T12:13:14+02:00\n\n" )
+            f.write( "---\ntitle: {}\n---\n".format( title ) )
+        return TestZimPage( fn )
+
+    def loadCache(self):
+        cache = AttributeCache( self.cacheFn )
+        cache.load()
+        return cache
+
+    def test_attributesAreReused(self):
+        page = self.writePage( "a", "A" )
+        cache = self.loadCache()
+        attrs, created = cache.loadAttributes( page )
+        self.assertEqual( attrs, { "title": "A" } )
+        self.assertEqual( created.year, 2018 )
+        cache.save()
+
+        cache = self.loadCache()
+        self.assertEqual( cache.loadAttributes( page )[0], { "title": "A" } )
+        self.assertFalse( cache.modified )
+
+    def test_unusedEntriesAreRemoved(self):
+        pageA = self.writePage( "a", "A" )
+        pageB = self.writePage( "b", "B" )
+        cache = self.loadCache()
+        cache.loadAttributes( pageA )
+        cache.loadAttributes( pageB )
+        cache.save()
+
+        cache = self.loadCache()
+        cache.loadAttributes( pageA )
+        cache.save()
+
+        cache = self.loadCache()
+        self.assertEqual( list( cache.entries.keys() ), [ pageA.source_file.path ] )
+
+if __name__ == "__main__":
+    unittest.main()
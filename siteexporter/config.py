@@ -15,7 +15,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from zim.notebook.page import Path
-from pageattributes import loadYamlAttributes
+from attrcache import loadCachedAttributes
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.config')
 
 # The id of the root config page. Different configurations are stored under
 # this page. The "active" property of the base config page defines the actual
@@ -23,15 +26,15 @@ from pageattributes import loadYamlAttributes
 configPageId = "00:00.config"
 
 class Configuration:
-    def __init__(self, zimPage, notebook, rootConfigPage):
+    def __init__(self, zimPage, notebook, rootConfigPage, attrCache=None):
         self.notebook = notebook
         self.zimPage = zimPage
-        self.attrs = loadYamlAttributes( zimPage )
+        self.attrs = loadCachedAttributes( zimPage, attrCache )
         self.parent = None
         if self != rootConfigPage and zimPage.parent is not None:
             parent = notebook.get_page( zimPage.parent )
             if parent is not None:
-                self.parent = Configuration( parent, notebook, rootConfigPage )
+                self.parent = Configuration( parent, notebook, rootConfigPage, attrCache )
 
     @property
     def name( self ):
@@ -51,20 +54,34 @@ class Configuration:
             return default
 
 
-def getActiveConfiguration( notebook ):
+# Read the integer value @p name from @p config.  The values from the YAML
+# blocks may be strings.  An invalid value is reported and @p default is used.
+def getIntValue( config, name, default ):
+    value = config.getValue( name, default ) if config is not None else default
+    if value is None:
+        return default
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logger.warning( "Invalid value for '{}': '{}'".format( name, value ) )
+        return default
+
+
+def getActiveConfiguration( notebook, attrCache=None ):
     global configPageId
     rootConfigPage = notebook.get_page( Path(configPageId) )
 
     if rootConfigPage is None or not rootConfigPage.exists():
         raise Exception( "Root Config Page '{}' not found.".format( configPageId ) )
 
-    globalAttrs = loadYamlAttributes( rootConfigPage )
+    globalAttrs = loadCachedAttributes( rootConfigPage, attrCache )
     if "active" in globalAttrs:
         activeId = "{}:{}".format( configPageId, globalAttrs["active"] )
         activeConfigPage = notebook.get_page( Path( activeId ) )
         if activeConfigPage is None or not activeConfigPage.exists():
             raise Exception( "Active Config Page '{}' not found.".format( activeId ) )
 
-        return Configuration( activeConfigPage, notebook, rootConfigPage )
+        return Configuration( activeConfigPage, notebook, rootConfigPage, attrCache )
 
-    return Configuration( rootConfigPage, notebook, rootConfigPage )
+    return Configuration( rootConfigPage, notebook, rootConfigPage, attrCache )
@@ -0,0 +1,37 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+from config import getIntValue
+from testsupport import TestConfig
+
+class TestIntValue(unittest.TestCase):
+    def test_parseNumbers(self):
+        config = TestConfig( { "pandocServers": "2", "pandocServerTimeout": 30 } )
+        self.assertEqual( getIntValue( config, "pandocServers", 0 ), 2 )
+        self.assertEqual( getIntValue( config, "pandocServerTimeout", 60 ), 30 )
+
+    def test_invalidValueUsesDefault(self):
+        config = TestConfig( { "pandocServers": "many", "pandocServerTimeout": None } )
+        self.assertEqual( getIntValue( config, "pandocServers", 0 ), 0 )
+        self.assertEqual( getIntValue( config, "pandocServerTimeout", 60 ), 60 )
+
+    def test_missingValueUsesDefault(self):
+        self.assertEqual( getIntValue( TestConfig(), "pandocServers", 0 ), 0 )
+        self.assertEqual( getIntValue( None, "pandocServers", 0 ), 0 )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,6 +17,8 @@
 from config import getActiveConfiguration
 from translation import Translations
 from processorfactory import PageTypeProcessorFactory, ProcessorRegistry
+from attrcache import AttributeCache
+from resourcefinder import ResourceFinder
 from zim.newfs import get_tmpdir
 import datetime
 import os, re
@@ -24,11 +26,16 @@ import os, re
 class ExporterData:
     def __init__( self, notebook ):
         self.notebook = notebook
-        self.config = getActiveConfiguration( notebook )
-        self.trans = Translations( self.config )
+        self._exportPath = self._makeExportPath( notebook )
+        self.attrCache = AttributeCache( self._exportPath + ".attributes.pickle" )
+        self.attrCache.load()
+        self.config = getActiveConfiguration( notebook, self.attrCache )
+        self.trans = Translations( self.config, self.attrCache )
+        self.resourceFinder = ResourceFinder( self.config, self._exportPath )
         self.now = datetime.datetime.now()
+        # The values of the extra attributes that are shared by many pages
+        self.sharedAttrs = {}
         self.pageTypeProcFactory = PageTypeProcessorFactory()
-        self._exportPath = self._makeExportPath( notebook )
         ProcessorRegistry.registerPageTypes( self.pageTypeProcFactory )
 
     def exportPath( self ):
@@ -14,17 +14,24 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import os, sys, re
-import shutil
-import subprocess as subp
+import os, sys, re, itertools
 
 import zim.formats
 
 # REQUIRE: pyyaml
-import yaml
 
 from templates import TemplateProcessor
-from resourcefinder import ResourceFinder
+from pandocrunner import PandocRunner, PandocJob
+from pandocserver import PandocServerRunner
+from publisher import DiffPublisher
+from resourcegraph import ResourceGraph
+from workerpool import getJobCount, mapParallel
+from pandoccache import PandocCache, getPandocVersion
+from yamlemitter import SharedYamlEmitter, dumpYaml
+from jsonemitter import SharedJsonEmitter
+from manifest import ExportManifest, pageSourceHash, hashFile, hashAttributes
+from textutil import hashText
+from config import getIntValue
 import sxpage
 
 import logging
@@ -32,6 +39,19 @@ logger = logging.getLogger('zim.plugins.siteexporter.exporter')
 
 pandoccmd = "pandoc"
 
+# The prefix of the links in the shared navigation index. It is replaced with
+# the relative path from a page to the root of the site.
+navRootPlaceholder = "SXNAVROOT/"
+
+# The markers around the extra attributes in the YAML block of a page
+sxBlockBegin = "# sx-begin\n"
+sxBlockEnd = "# sx-end\n"
+
+# The options of the conversion for pandoc-server. They must match the
+# command line options used in SiteExporter.makeHtml.
+pandocServerOptions = { "from": "markdown+raw_html", "to": "html5",
+        "standalone": True, "section-divs": True }
+
 class IndexEntry:
     def __init__( self, page ):
         self.page = page
@@ -47,12 +67,25 @@ class SiteExporter:
     def __init__(self, exportData):
         self.exportData = exportData
         self.mkdPages = None
+        self.registry = None
         self.config = exportData.config
         self.zimNotebookDir = exportData.notebook.layout.root
         self.layout = None
         self.homepage = None
-        self.templateProc = TemplateProcessor()
-        self.resourceFinder = ResourceFinder( self.config, self.exportData.exportPath() )
+        self.templateProc = TemplateProcessor( self.exportData.exportPath() + ".template-cache" )
+        self.resourceFinder = exportData.resourceFinder
+        hasConfig = self.config is not None
+        self.streamMarkdown = self.config.getValue( "streamMarkdown", False ) if hasConfig else False
+        self.htmlToPubdir = self.config.getValue( "htmlToPubdir", False ) if hasConfig else False
+        self.metadataFormat = self.config.getValue( "metadataFormat", "yaml" ) if hasConfig else "yaml"
+        self.pubdir = None
+        self.manifest = ExportManifest( self.exportData.exportPath() + ".manifest.json",
+                { "streamMarkdown": self.streamMarkdown, "htmlToPubdir": self.htmlToPubdir,
+                    "metadataFormat": self.metadataFormat, "templateCache": True } )
+        self.pandocCache = self._makePandocCache()
+        self.templateHashes = {}
+        self.yamlEmitter = SharedYamlEmitter()
+        self.jsonEmitter = SharedJsonEmitter()
 
 
     # from zim.export
@@ -81,27 +114,43 @@ class SiteExporter:
         pages = AllPages(self.exportData.notebook)
 
         self.mkdPages = [ sxpage.MarkdownPage( p, self.exportData ) for p in pages if p.exists() ]
-        sxpage.findPageParents( self.mkdPages )
+        self.registry = sxpage.findPageParents( self.mkdPages )
+        self.registry.resolveDerivedValues()
+        self.registry.evaluatePublishState()
+
+        changedIds = self.findChangedPages( self.mkdPages )
+        if len(changedIds) < len(self.mkdPages):
+            logger.debug( "Pages changed since the last export: {}".format( len(changedIds) ) )
+            pages = self._makeChangedPagesSelection( changedIds )
 
         # The iterator returns the page BEFORE it is exported
-	for p in exporter.export_iter(pages):
+        for p in exporter.export_iter(pages):
             logger.debug( "Exporting: {}: {}".format( type(p), p ) )
 
-	for page in self.mkdPages:
-            logger.debug( "Process: {}".format( page ) )
-            self.processExportedPage( page )
+        # When the markdown is streamed to Pandoc, the exported files are never
+        # modified so they have to be processed in every export.
+        for page in self.mkdPages:
+            if page.reexported or self.streamMarkdown:
+                logger.debug( "Process: {}".format( page ) )
+                self.processExportedPage( page )
+
+        newPages = self.digestPages( self.mkdPages )
 
-	for page in self.mkdPages:
-            processor = self.getPageProcessor( page )
-            if processor is not None:
-                newfiles = []
-                processor.digest( page, self.mkdPages, newfiles )
+        # Pages generated by the processors are not digested.
+        for page in newPages:
+            logger.debug( "Generated: {}".format( page ) )
+            self.registry.addGenerated( page )
+            self.mkdPages.append( page )
 
         index = self.createPageIndex( self.mkdPages )
+        sharedNavIndex = self.isSharedNavIndex() and self.renderSharedNavIndex( index )
 
         for page in self.mkdPages:
             if page.isPublished():
-                self.addPageIndex( page, index )
+                if sharedNavIndex:
+                    self.addPageNavMarker( page )
+                else:
+                    self.addPageIndex( page, index )
                 self.addPageStyle( page )
 
         templates = set([])
@@ -110,14 +159,24 @@ class SiteExporter:
 
         for templateFn in templates:
             self.templateProc.processTemplate(templateFn)
+        self.templateProc.removeUnusedTemplates()
 
         for page in self.mkdPages:
             if page.isPublished():
-                page.completeExtraAttrs( self.exportData, self.templateProc.translatedVars,
-                        self.templateProc.resourceVars )
+                variables = self.templateProc.getTemplateVariables( self.getCompiledTemplate( page ) )
+                page.completeExtraAttrs( self.exportData, variables["translated"],
+                        variables["resources"] )
                 self._writeExtraAttrs( page )
+        logger.debug( "Shared metadata values reused: {}".format(
+            self.yamlEmitter.hits + self.jsonEmitter.hits ) )
 
-        self.makeHtml( self.mkdPages )
+        if not self.streamMarkdown:
+            for page in self.mkdPages:
+                page.writeMarkdown()
+
+        failed = self.makeHtml( self.mkdPages )
+        self.updateManifest( self.mkdPages, failed )
+        self.exportData.attrCache.save()
         self.copyFilesToPubDir()
 
 
@@ -126,11 +185,7 @@ class SiteExporter:
 
 
     def getPage( self, pageId ):
-        for p in self.mkdPages:
-            if p.id == pageId:
-                return p
-
-        return None
+        return self.registry.getPage( pageId )
 
 
     def getHomepage( self ):
@@ -141,13 +196,110 @@ class SiteExporter:
         return self.homepage
 
 
+    def getPubDir( self ):
+        if self.pubdir is None:
+            config = self.config
+            hasConfig = config is not None
+            pubdir = config.getValue( "pubdir" ) if hasConfig else None
+            if pubdir is None:
+                raise Exception( "Value 'pubdir' is not set on the config page '{}'".format( config.configPageId ) )
+
+            if not os.path.isabs( pubdir ):
+                pubdir = os.path.normpath( os.path.join( self.zimNotebookDir.encodedpath, pubdir ) )
+            self.pubdir = pubdir
+
+        return self.pubdir
+
+
+    # The file where Pandoc writes the HTML for the page.
+    def htmlOutputPath( self, page ):
+        if self.htmlToPubdir:
+            return os.path.join( self.getPubDir(), page.htmlFilename )
+        return page.fullHtmlFilename()
+
+
+    def isIncremental( self ):
+        return self.config.getValue( "incremental", True ) if self.config is not None else True
+
+
+    # Find the pages that have to be exported from Zim again.
+    def findChangedPages( self, mkdPages ):
+        manifest = self.manifest
+        incremental = self.isIncremental()
+        if incremental:
+            manifest.load()
+        manifest.discard()
+
+        changedIds = set()
+        for page in mkdPages:
+            page.sourceHash = pageSourceHash( self.exportData.notebook, page.zimPage )
+            manifest.setState( page.id, "source", page.sourceHash )
+            manifest.setState( page.id, "attrs", hashAttributes( page.attrs ) )
+            page.reexported = ( not incremental
+                    or manifest.getPrevious( page.id, "source" ) != page.sourceHash
+                    or not os.path.exists( page.fullFilename() ) )
+            if page.reexported:
+                changedIds.add( page.id )
+
+        return changedIds
+
+
+    def _makeChangedPagesSelection( self, changedIds ):
+        from zim.export.selections import AllPages
+
+        class ChangedPages( AllPages ):
+            def __iter__( self ):
+                for page in AllPages.__iter__( self ):
+                    if page.name in changedIds:
+                        yield page
+
+        return ChangedPages( self.exportData.notebook )
+
+
+    def updateManifest( self, mkdPages, failed ):
+        failedIds = set([ res.page.id for res in failed ])
+        for page in mkdPages:
+            if page.outputHash is not None and not page.id in failedIds:
+                self.manifest.setState( page.id, "output", page.outputHash )
+
+        self.manifest.save()
+
+
+    def _makePandocCache( self ):
+        size = getIntValue( self.config, "pandocCacheSize", 100 )
+        if size <= 0:
+            return None
+        cacheDir = self.exportData.exportPath() + ".pandoc-cache"
+        return PandocCache( cacheDir, size * 1024 * 1024 )
+
+
     def getPageProcessor( self, page ):
         return self.exportData.pageTypeProcFactory.getProcessor( page.getPageType() )
 
 
+    # Collect the changes of all pages in parallel and apply them in the order
+    # of the pages.  Return the pages generated by the processors.
+    def digestPages( self, mkdPages ):
+        processed = [ (page, self.getPageProcessor( page )) for page in mkdPages ]
+        processed = [ (page, proc) for page, proc in processed if proc is not None ]
+
+        def collect( item ):
+            page, processor = item
+            return processor.collect( page, self.registry )
+
+        allChanges = mapParallel( collect, processed, getJobCount( self.config ) )
+
+        newPages = []
+        for (page, processor), changes in zip( processed, allChanges ):
+            if changes is None:
+                processor.digest( page, self.registry, newPages )
+            else:
+                processor.merge( page, changes, newPages )
+        return newPages
+
+
     def processExportedPage( self, page ):
-        with open( page.fullFilename() ) as f:
-            mkdLines = f.readlines()
+        mkdLines = page.getMarkdown()
 
         if len(mkdLines) == 0:
             return
@@ -155,10 +307,7 @@ class SiteExporter:
         if mkdLines[0].startswith( "#" ):
             mkdLines = mkdLines[1:]
 
-        mkdLines = self.fixExportedLinks( mkdLines )
-
-        with open( page.fullFilename(), "w" ) as fout:
-            fout.write( "".join( mkdLines ) )
+        page.setMarkdown( self.fixExportedLinks( mkdLines ) )
 
 
     def fixExportedLinks( self, mkdLines ):
@@ -178,17 +327,16 @@ class SiteExporter:
         entries.sort( key=lambda p: (p.level(), p.weight(), p.menuText()) )
 
         # Find parent relations by page id
+        entriesById = dict([ (e.page.id, e) for e in entries ])
         for e in entries:
             for l in range(e.level()):
                 pid = e.page.parentId( l+1 )
                 if len(pid) == 0:
                     break
-                for p in entries:
-                    if p.page.id == pid:
-                        e.parent = p
-                        p.entries.append( e )
-                        break
-                if e.parent is not None:
+                p = entriesById.get( pid )
+                if p is not None:
+                    e.parent = p
+                    p.entries.append( e )
                     break
 
         index = IndexEntry( None )
@@ -197,11 +345,63 @@ class SiteExporter:
         return index
 
 
+    def isSharedNavIndex( self ):
+        mode = self.config.getValue( "navindexMode", "page" ) if self.config is not None else "page"
+        return mode == "shared"
+
+
+    # Render the template chunk with the navigation index once for all the
+    # pages. The rendered chunk replaces the inclusion of the chunk in the
+    # templates and the links in it are relative to $sx.root$.
+    def renderSharedNavIndex( self, index ):
+        chunkName = self.config.getValue( "navindexChunk", "navigationbar.htmli" )
+        chunkFn = os.path.join( self.resourceFinder.layoutPath(), chunkName )
+        if not os.path.exists( chunkFn ):
+            logger.warning( "Navigation index chunk '{}' not found.".format( chunkFn ) )
+            return False
+
+        # The files are kept out of the export directory so that they can not
+        # clash with the exported pages.
+        navDir = self.exportData.exportPath() + ".navindex"
+        if not os.path.exists( navDir ):
+            os.makedirs( navDir )
+        sharedFn = os.path.join( navDir, "navindex.htmli" )
+        with open( sharedFn, "w" ) as f:
+            f.write( "".join( self.templateProc.prepareSharedChunk( chunkFn ) ) )
+
+        def makeRootRelative( path ):
+            return navRootPlaceholder + path
+
+        navindex = self._renderIndexEntries( index, makeRootRelative )
+        mkdText = "---\n{}---\n".format( dumpYaml( { "sx": navindex } ) )
+        outpath = os.path.join( navDir, "navindex.html" )
+        cmd = [ pandoccmd, "-f", "markdown", "-t", "html5", "--template", sharedFn, "-o", outpath ]
+        res = PandocRunner().run( [ PandocJob( None, cmd, outpath, mkdText ) ] )[0]
+        if res.failed():
+            logger.error( "Pandoc failed on the shared navigation index: {}".format( res.stderr ) )
+            return False
+
+        with open( outpath ) as f:
+            html = f.read()
+        self.templateProc.addSharedChunk( chunkName, html, { navRootPlaceholder: "sx.root" } )
+        return True
+
+
+    # The links are the same for all the pages in a directory so the index is
+    # rendered once per directory.
     def _renderYamlIndex( self, page, index ):
         curDir = os.path.dirname( page.htmlFilename )
-        def makeRelative( path ):
-            return os.path.relpath( path, curDir )
+        key = ( "navindex", curDir )
+        sharedAttrs = self.exportData.sharedAttrs
+        if not key in sharedAttrs:
+            def makeRelative( path ):
+                return os.path.relpath( path, curDir )
+            sharedAttrs[key] = self._renderIndexEntries( index, makeRelative )
+
+        return sharedAttrs[key]
 
+
+    def _renderIndexEntries( self, index, makeRelative ):
         def dumpEntries( entries, level ):
             index = []
             for e in entries:
@@ -227,9 +427,9 @@ class SiteExporter:
         return index
 
 
-    # Find a point for inserting generated code, eg. the index.
-    # Currently this is just after the yaml block if it starts in the first 10 lines.
-    def _findYamlInsertionPoint( self, mkdLines ):
+    # Find the yaml block if it starts in the first 10 lines. Return the
+    # positions of the starting and the terminating line.
+    def _findYamlBlock( self, mkdLines ):
         for i,line in enumerate(mkdLines):
             if i > 10:
                 break
@@ -239,25 +439,110 @@ class SiteExporter:
             while j < len(mkdLines):
                 line = mkdLines[j].rstrip()
                 if line == "---" or line == "...":
-                    return j
+                    return (i, j)
                 j += 1
             break
 
+        return None
+
+    # Find a point for inserting generated code, eg. the index.
+    # Currently this is just after the yaml block if it starts in the first 10 lines.
+    def _findYamlInsertionPoint( self, mkdLines ):
+        block = self._findYamlBlock( mkdLines )
+        if block is not None:
+            return block[1]
+
         mkdLines[0:0] = [ "---\n", "---\n", "\n" ]
         return 1
 
+    # Remove the extra attributes that were written in a previous export.
+    # The attributes are written between the markers at the end of the YAML
+    # block.  The values may contain empty lines so the end of the attributes
+    # can not be found from the indentation.
+    def _removeExtraAttrs( self, mkdLines ):
+        block = self._findYamlBlock( mkdLines )
+        if block is None:
+            return
+
+        start, end = block
+        for i in range( start+1, end ):
+            if mkdLines[i].rstrip() == sxBlockBegin.rstrip():
+                j = i+1
+                while j < end and mkdLines[j].rstrip() != sxBlockEnd.rstrip():
+                    j += 1
+                del mkdLines[i:min( j+1, end )]
+                return
+
+            # Written before the markers were used; always the last entry.
+            if mkdLines[i].startswith( "sx:" ):
+                del mkdLines[i:end]
+                return
+
+    def getCompiledTemplate( self, page ):
+        return self.templateProc.getCompiledTemplate( self.resourceFinder.getPageTemplate( page ) )
+
+    def _getTemplateHash( self, template ):
+        if not template in self.templateHashes:
+            exists = template is not None and os.path.exists( template )
+            self.templateHashes[template] = hashFile( template ) if exists else None
+        return self.templateHashes[template]
+
+    def isJsonMetadata( self ):
+        return self.metadataFormat == "json"
+
+    # The JSON metadata file of a page is written next to its markdown file.
+    def metadataFilename( self, page ):
+        return os.path.splitext( page.fullFilename() )[0] + ".sx.json"
+
     def _writeExtraAttrs( self, page ):
         if len(page.extraAttrs) == 0:
             return
 
-        with open( page.fullFilename() ) as f:
-            mkdLines = f.readlines()
+        if self.isJsonMetadata():
+            metaText = self.jsonEmitter.dump( page.extraAttrs )
+        else:
+            metaText = self.yamlEmitter.dump( page.extraAttrs )
+        template = self.getCompiledTemplate( page )
+        page.outputHash = hashText( page.sourceHash, metaText, self._getTemplateHash( template ) )
+
+        manifest = self.manifest
+        manifest.setState( page.id, "template", template )
+        manifest.setState( page.id, "style", page.style )
+        manifest.setState( page.id, "sx", hashText( metaText ) )
+        if ( not page.reexported
+                and manifest.getPrevious( page.id, "output" ) == page.outputHash
+                and os.path.exists( self.htmlOutputPath( page ) ) ):
+            page.upToDate = True
+            return
+
+        if self.isJsonMetadata():
+            self._writeMetadataFile( page, metaText )
+            return
+
+        mkdLines = list( page.getMarkdown() )
+
+        if not page.reexported and not self.streamMarkdown:
+            self._removeExtraAttrs( mkdLines )
 
         yamlPos = self._findYamlInsertionPoint( mkdLines )
-        with open( page.fullFilename(), "w" ) as fout:
-            fout.write( "".join( mkdLines[:yamlPos] ) )
-            fout.write( yaml.dump( { "sx": page.extraAttrs } ) )
-            fout.write( "".join( mkdLines[yamlPos:] ) )
+        mkdLines[yamlPos:yamlPos] = [ sxBlockBegin ] + metaText.splitlines( True ) + [ sxBlockEnd ]
+        page.setMarkdown( mkdLines )
+
+
+    # The markdown text of the page is not modified.
+    #
+    # Each page has a single metadata file with all the values.  Pandoc merges
+    # several metadata files only by their top-level keys, so the shared values
+    # of the variable sx can not be moved to a separate site-level file.  The
+    # shared values are serialized once by the emitter, instead.
+    def _writeMetadataFile( self, page, metaText ):
+        page.metadataFile = self.metadataFilename( page )
+        page.metadataText = metaText
+        dirname = os.path.dirname( page.metadataFile )
+        if not os.path.exists( dirname ):
+            os.makedirs( dirname )
+        with open( page.metadataFile, "w" ) as f:
+            f.write( metaText )
 
 
     def addPageIndex( self, page, index ):
@@ -267,6 +552,18 @@ class SiteExporter:
         page.addExtraAttrs( self._renderYamlIndex(page, index) )
 
 
+    # With a shared navigation index a page only needs the path to the root of
+    # the site and the id of its active menu entry.
+    def addPageNavMarker( self, page ):
+        attrs = { "root": "../" * (page.level - 1) }
+        for p in itertools.chain( [ page ], page.iterAncestors() ):
+            if p.hasMenuEntry():
+                attrs["navactive"] = p.id
+                break
+
+        page.addExtraAttrs( attrs )
+
+
     def addPageStyle( self, page ):
         style = self.resourceFinder.getPageStyleFile( page )
         if style is None:
@@ -284,52 +581,98 @@ class SiteExporter:
         command += [ "--standalone" ]
         command += [ "--section-divs" ]
 
+        cache = self.pandocCache
+        jobs = []
         for page in mkdFiles:
-            if not page.isPublished():
+            if not page.isPublished() or page.upToDate:
                 continue
 
-            template = self.resourceFinder.getPageTemplate( page )
-            mkdpath = page.fullFilename()
-            outpath = page.fullHtmlFilename()
-            filenames = ["-o",  outpath, mkdpath ]
-            cmd = command + [ "--template", template ] + filenames
-            logger.debug( " ".join(cmd) )
-            subp.call(cmd)
+            template = self.getCompiledTemplate( page )
+            outpath = self.htmlOutputPath( page )
+            metadata = []
+            if page.metadataFile is not None:
+                metadata = [ "--metadata-file", page.metadataFile ]
+            if self.streamMarkdown:
+                cmd = command + [ "--template", template ] + metadata + [ "-o", outpath ]
+                job = PandocJob( page, cmd, outpath, "".join( page.getMarkdown() ) )
+            else:
+                filenames = ["-o",  outpath, page.fullFilename() ]
+                cmd = command + [ "--template", template ] + metadata + filenames
+                job = PandocJob( page, cmd, outpath )
+                job.sourcefile = page.fullFilename()
+            job.template = template
+            job.options = pandocServerOptions
+            job.metadata = page.metadataText
+
+            if cache is not None:
+                markdown = "".join( page.getMarkdown() )
+                # The name of the input file is a part of the key because
+                # Pandoc uses it as the default page title.
+                keyParts = [ getPandocVersion( pandoccmd ), " ".join( command ),
+                        page.filename, self._getTemplateHash( template ), markdown ]
+                if page.metadataText is not None:
+                    keyParts.append( page.metadataText )
+                job.cacheKey = cache.makeKey( *keyParts )
+                if cache.fetch( job.cacheKey, outpath ):
+                    continue
 
+            # The output may be a hard link to a cached file.
+            if os.path.exists( outpath ) and os.stat( outpath ).st_nlink > 1:
+                os.remove( outpath )
+            elif not os.path.exists( os.path.dirname( outpath ) ):
+                os.makedirs( os.path.dirname( outpath ) )
+
+            jobs.append( job )
+
+        runner = PandocRunner( getJobCount( self.config ) )
+        serverCount = getIntValue( self.config, "pandocServers", 0 )
+        servers = []
+        if serverCount > 0 and len(jobs) > 0:
+            timeout = getIntValue( self.config, "pandocServerTimeout", 60 )
+            if timeout <= 0:
+                timeout = 60
+            servers = PandocServerRunner.startServers( pandoccmd, serverCount, timeout )
+            if len(servers) > 0:
+                runner = PandocServerRunner( servers, runner, getJobCount( self.config ) )
+            else:
+                logger.warning( "pandoc-server is not available. Running Pandoc for each page." )
+
+        try:
+            results = runner.run( jobs )
+        finally:
+            for server in servers:
+                server.stop()
+
+        failed = []
+        for res in results:
+            if res.failed():
+                logger.error( "Pandoc failed on page '{}' ({}): {}".format(
+                    res.page.id, res.returncode, res.stderr ) )
+                failed.append( res )
+                continue
 
-    def copyFilesToPubDir( self ):
-        config = self.config
-        hasConfig = config is not None
-        pubdir = config.getValue( "pubdir" ) if hasConfig else None
-        if pubdir is None:
-            raise Exception( "Value 'pubdir' is not set on the config page '{}'".format( config.configPageId ) )
+            if len(res.stderr) > 0:
+                logger.warning( "Pandoc on page '{}': {}".format( res.page.id, res.stderr ) )
+            if cache is not None:
+                cache.store( res.job.cacheKey, res.job.outpath )
+
+        if len(failed) > 0:
+            logger.error( "Pandoc failed on {} of {} pages.".format( len(failed), len(jobs) ) )
+
+        if cache is not None:
+            logger.debug( "Pandoc cache: {} hits, {} misses.".format( cache.hits, cache.misses ) )
+            cache.evict()
+
+        return failed
 
-        if not os.path.isabs( pubdir ):
-            pubdir = os.path.normpath( os.path.join( self.zimNotebookDir.encodedpath, pubdir ) )
 
+    def copyFilesToPubDir( self ):
+        pubdir = self.getPubDir()
         if not os.path.exists( pubdir ):
             os.makedirs( pubdir )
 
-        def getHtmlLinks( fn ):
-            html = open( fn ).read()
-            rxLink =  re.compile( r'''(src|href)="([^"]+)"''' )
-            return set([ mo.group(2) for mo in rxLink.finditer( html ) ])
-
-        def getCssLinks( fn ):
-            css = open( fn ).read()
-            rxLink =  re.compile( r'''url\s*\(\s*["']?([^'")]+)["']?\s*\)''' )
-            return set([ mo.group(1) for mo in rxLink.finditer( css ) ])
-
-        def recurseCssLinks( link, basedir, resources ):
-            cssfn = os.path.normpath( os.path.join( basedir, link ) )
-            cssdir = os.path.dirname( cssfn )
-            cssurls = getCssLinks( cssfn )
-            for url in cssurls:
-                ressrc = os.path.normpath( os.path.join( cssdir, url ) )
-                if os.path.exists( ressrc ) and not ressrc in resources:
-                    resources.add( os.path.relpath( ressrc, self.exportData.exportPath() ) )
-                    if url.endswith( ".css" ):
-                        recurseCssLinks( url, cssdir, resources )
+        graph = ResourceGraph( self.exportData.exportPath() + ".resources.json" )
+        graph.load()
 
         # Discover pages and resources to copy
         pages = set()
@@ -337,38 +680,30 @@ class SiteExporter:
         for page in self.mkdPages:
             if not page.isPublished():
                 continue
+            if not os.path.exists( self.htmlOutputPath( page ) ):
+                logger.debug( "Page '{}' has no HTML file.".format( page.id ) )
+                continue
 
             pages.add( os.path.relpath( page.fullHtmlFilename(), self.exportData.exportPath() ) )
 
-            links = getHtmlLinks( page.fullHtmlFilename() )
-            for link in links:
-                if link.endswith( ".html" ):
-                    continue
-                htmldir = os.path.dirname( page.fullHtmlFilename() )
-                ressrc = os.path.normpath( os.path.join( htmldir, link ) )
-                if not os.path.exists( ressrc ):
-                    continue
-
-                resources.add( os.path.relpath( ressrc, self.exportData.exportPath() ) )
-
-                if link.endswith( ".css" ):
-                    recurseCssLinks( link, htmldir, resources )
-
-        filesToCopy = pages.union(resources)
-
-        # Remove destination files that are not in pages + resources
-        for root, dirs, files in os.walk( pubdir ):
-            for fn in files:
-                destfn = os.path.join( root, fn )
-                relfn = os.path.relpath( destfn, pubdir )
-                if not relfn in filesToCopy:
-                    os.remove( destfn )
-
-        # Copy the discovered pages and resources
-        for res in filesToCopy:
-            ressrc = os.path.join( self.exportData.exportPath(), res )
-            resdst = os.path.join( pubdir, res )
-            if not os.path.exists( os.path.dirname( resdst ) ):
-                os.makedirs( os.path.dirname( resdst ) )
-            shutil.copyfile( ressrc, resdst )
-
+            # The resources are always found relative to the export path.
+            htmldir = os.path.dirname( page.fullHtmlFilename() )
+            resources.update( graph.findHtmlResources( self.htmlOutputPath( page ), htmldir ) )
+
+        graph.save()
+        resources = set([ os.path.relpath( ressrc, self.exportData.exportPath() )
+            for ressrc in resources ])
+
+        # Map the discovered pages and resources to their sources. The pages
+        # are already in pubdir if Pandoc wrote them there.
+        files = {}
+        for rel in pages:
+            if self.htmlToPubdir:
+                files[rel] = os.path.join( pubdir, rel )
+            else:
+                files[rel] = os.path.join( self.exportData.exportPath(), rel )
+        for rel in resources:
+            files[rel] = os.path.join( self.exportData.exportPath(), rel )
+
+        stage = self.config.getValue( "publishStage", False ) if self.config is not None else False
+        DiffPublisher( pubdir, stage ).publish( files )
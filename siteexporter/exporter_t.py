@@ -0,0 +1,255 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from exporter import SiteExporter
+from processorfactory import Processor, ProcessorRegistry, PageChanges
+from testsupport import TestConfig, TestExportData
+
+class TestSource:
+    def __init__(self, path):
+        self.path = path
+
+class TestZimPage:
+    def __init__(self, path):
+        self.source_file = TestSource( path )
+
+class TestPage:
+    """The members of a MarkdownPage used by the exporter."""
+
+    def __init__(self, exportPath, mkdLines, extraAttrs, sourceHash=None, zimPage=None):
+        self.exportPath = exportPath
+        self.id = "page"
+        self.filename = "page.markdown"
+        self.htmlFilename = "page.html"
+        self.zimPage = zimPage
+        self.attrs = {}
+        self.templateBasename = None
+        self.template = None
+        self.style = None
+        self.mkdLines = mkdLines
+        self.extraAttrs = extraAttrs
+        self.sourceHash = sourceHash
+        self.outputHash = None
+        self.reexported = True
+        self.upToDate = False
+
+    def getPageType(self):
+        return "page"
+
+    def getMarkdown(self):
+        return self.mkdLines
+
+    def setMarkdown(self, mkdLines):
+        self.mkdLines = mkdLines
+
+    def fullFilename(self):
+        return os.path.join( self.exportPath, self.filename )
+
+    def fullHtmlFilename(self):
+        return os.path.join( self.exportPath, self.htmlFilename )
+
+class ExporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.exportPath = os.path.join( self.tmpdir, "export" )
+        self.layout = os.path.join( self.exportPath, "layout", "web" )
+        os.makedirs( self.layout )
+        self.writeTemplate( "<html>$body$</html>\n" )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writeTemplate(self, text):
+        with open( os.path.join( self.layout, "default.html5" ), "w" ) as f:
+            f.write( text )
+
+    def makeExporter(self, values=None):
+        config = dict( values ) if values is not None else {}
+        config["layout"] = "layout:web"
+        exporter = SiteExporter( TestExportData( TestConfig( config ), self.exportPath ) )
+        exporter.templateProc.processTemplate( os.path.join( self.layout, "default.html5" ) )
+        return exporter
+
+    def makePage(self, extraAttrs, sourceHash="source"):
+        original = [ "---\n", "title: News\n", "---\n", "\n", "Text\n" ]
+        return TestPage( self.exportPath, list( original ), extraAttrs, sourceHash )
+
+class TestExtraAttrs(ExporterTestCase):
+    def test_rewriteMultiParagraphValues(self):
+        exporter = self.makeExporter()
+        page = self.makePage( {} )
+        original = list( page.mkdLines )
+        brief = "First paragraph that is long enough to be wrapped by the emitter.\n\nSecond paragraph."
+        page.extraAttrs = { "news-activeitems": [ { "brief": brief, "id": "a" } ] }
+        exporter._writeExtraAttrs( page )
+        self.assertTrue( "# sx-begin\n" in page.mkdLines )
+        self.assertTrue( len(page.mkdLines) > len(original) + 3 )
+
+        # The markdown file of the page was not exported again.
+        page.reexported = False
+        page.extraAttrs = { "title": "News" }
+        exporter._writeExtraAttrs( page )
+        self.assertEqual( page.mkdLines, original[:2] +
+                [ "# sx-begin\n", "sx:\n", "  title: News\n", "# sx-end\n" ] + original[2:] )
+
+    def test_removeAttrsWithoutMarkers(self):
+        exporter = self.makeExporter()
+        mkdLines = [ "---\n", "title: News\n", "sx:\n", "  brief: 'a\n", "\n", "  b'\n", "---\n", "Text\n" ]
+        exporter._removeExtraAttrs( mkdLines )
+        self.assertEqual( mkdLines, [ "---\n", "title: News\n", "---\n", "Text\n" ] )
+
+class TestIncrementalExport(ExporterTestCase):
+    # Write the page in the first export and return the state of the page in
+    # the second export.
+    def exportTwice(self, extraAttrs, sourceHash="source", template=None):
+        exporter = self.makeExporter()
+        page = self.makePage( { "title": "a" } )
+        exporter._writeExtraAttrs( page )
+        self.assertFalse( page.upToDate )
+        with open( page.fullHtmlFilename(), "w" ) as f:
+            f.write( "<html></html>" )
+        exporter.updateManifest( [ page ], [] )
+
+        if template is not None:
+            self.writeTemplate( template )
+        exporter = self.makeExporter()
+        exporter.manifest.load()
+        page = self.makePage( extraAttrs, sourceHash )
+        page.reexported = False
+        exporter._writeExtraAttrs( page )
+        return page
+
+    def test_unchangedPageIsSkipped(self):
+        page = self.exportTwice( { "title": "a" } )
+        self.assertTrue( page.upToDate )
+
+    def test_changedSourceIsRendered(self):
+        page = self.exportTwice( { "title": "a" }, sourceHash="changed" )
+        self.assertFalse( page.upToDate )
+
+    def test_changedAttrsAreRendered(self):
+        page = self.exportTwice( { "title": "b" } )
+        self.assertFalse( page.upToDate )
+
+    def test_changedTemplateIsRendered(self):
+        page = self.exportTwice( { "title": "a" }, template="<html><body>$body$</body></html>\n" )
+        self.assertFalse( page.upToDate )
+
+    def test_changedSourceFileIsExported(self):
+        sourceFn = os.path.join( self.tmpdir, "page.txt" )
+        with open( sourceFn, "w" ) as f:
+            f.write( "Text\n" )
+        def makeZimPage():
+            return TestPage( self.exportPath, [], {}, zimPage=TestZimPage( sourceFn ) )
+
+        exporter = self.makeExporter()
+        page = makeZimPage()
+        self.assertEqual( exporter.findChangedPages( [ page ] ), set([ "page" ]) )
+        with open( page.fullFilename(), "w" ) as f:
+            f.write( "Text\n" )
+        exporter.updateManifest( [ page ], [] )
+
+        exporter = self.makeExporter()
+        page = makeZimPage()
+        self.assertEqual( exporter.findChangedPages( [ page ] ), set() )
+        self.assertFalse( page.reexported )
+        exporter.updateManifest( [ page ], [] )
+
+        with open( sourceFn, "w" ) as f:
+            f.write( "Changed text\n" )
+        exporter = self.makeExporter()
+        page = makeZimPage()
+        self.assertEqual( exporter.findChangedPages( [ page ] ), set([ "page" ]) )
+        self.assertTrue( page.reexported )
+
+class DigestTestPage:
+    def __init__(self, id, pageType, parent=None):
+        self.id = id
+        self.pageType = pageType
+        self.parent = parent
+        self.extraAttrs = {}
+
+    def getPageType(self):
+        return self.pageType
+
+    def addExtraAttrs(self, attrDict):
+        self.extraAttrs.update( attrDict )
+
+# Every page overwrites the same attribute of its parent, so the result
+# depends on the order in which the changes are merged.
+class ParentDigestTestProcessor( Processor ):
+    def collect( self, page, pages ):
+        # The later pages are collected first.
+        time.sleep( 0.001 * ( 10 - int( page.id.split( "-" )[-1] ) ) )
+        changes = PageChanges()
+        changes.addExtraAttrs( page.parent, { "last-child": page.id } )
+        changes.addExtraAttrs( page, { "collected": True } )
+        changes.addPage( DigestTestPage( page.id + ":new", "page" ) )
+        return changes
+
+# A processor that is digested serially in the merge phase.
+class SerialDigestTestProcessor( Processor ):
+    def digest( self, page, pages, newPages ):
+        page.addExtraAttrs( { "pages-before": [ p.id for p in newPages ] } )
+
+class DigestTestRegister( ProcessorRegistry ):
+    def registerPageTypes( self, pageTypeProcFactory ):
+        pageTypeProcFactory.registerPageType( "test.parent", ParentDigestTestProcessor.__name__ )
+        pageTypeProcFactory.registerPageType( "test.serial", SerialDigestTestProcessor.__name__ )
+
+class TestDigestPages(ExporterTestCase):
+    def digest(self, jobs):
+        root = DigestTestPage( "root", "page" )
+        pages = [ root ]
+        for i in range(10):
+            pageType = "test.serial" if i % 4 == 3 else "test.parent"
+            pages.append( DigestTestPage( "page-{}".format( i ), pageType, root ) )
+
+        exporter = self.makeExporter( { "jobs": jobs } )
+        newPages = exporter.digestPages( pages )
+        return [ (p.id, p.extraAttrs) for p in pages ], [ p.id for p in newPages ]
+
+    def test_parallelDigestMatchesSerial(self):
+        serial = self.digest( 1 )
+        parallel = self.digest( 4 )
+        self.assertEqual( parallel, serial )
+
+        state, newPages = serial
+        self.assertEqual( state[0], ( "root", { "last-child": "page-9" } ) )
+        self.assertEqual( state[4], ( "page-3", { "pages-before": [ "page-0:new", "page-1:new", "page-2:new" ] } ) )
+        self.assertEqual( len(newPages), 8 )
+
+class TestPandocCache(ExporterTestCase):
+    def makeCache(self, size):
+        return self.makeExporter( { "pandocCacheSize": size } ).pandocCache
+
+    def test_sizeIsParsed(self):
+        self.assertEqual( self.makeCache( "20" ).maxSize, 20 * 1024 * 1024 )
+
+    def test_invalidSizeUsesDefault(self):
+        self.assertEqual( self.makeCache( "big" ).maxSize, 100 * 1024 * 1024 )
+
+    def test_cacheIsDisabled(self):
+        self.assertIsNone( self.makeCache( 0 ) )
+        self.assertIsNone( self.makeCache( "-1" ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+
+
+# Replace @p dst with @p src.  On POSIX the rename replaces the file
+# atomically.  Windows can not rename over an existing file in Python 2 so
+# the file is removed first, there.
+def replaceFile( src, dst ):
+    replace = getattr( os, "replace", None )
+    if replace is not None:
+        replace( src, dst )
+        return
+
+    try:
+        os.rename( src, dst )
+    except OSError:
+        if not os.path.exists( dst ):
+            raise
+        os.remove( dst )
+        os.rename( src, dst )
+
+
+# Write @p filename with the function @p write that receives the open file.
+# The data is written to a temporary file which then replaces @p filename, so
+# the file is never left half-written.
+def writeFileAtomic( filename, write, binary=False ):
+    dirname = os.path.dirname( filename )
+    if dirname != "" and not os.path.exists( dirname ):
+        os.makedirs( dirname )
+    tmpname = filename + ".tmp"
+    with open( tmpname, "wb" if binary else "w" ) as f:
+        write( f )
+    replaceFile( tmpname, filename )
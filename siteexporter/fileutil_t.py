@@ -0,0 +1,51 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from fileutil import writeFileAtomic
+
+class TestWriteFileAtomic(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def readFile(self, fn):
+        with open( fn ) as f:
+            return f.read()
+
+    def test_replaceExistingFile(self):
+        fn = os.path.join( self.tmpdir, "sub", "data.json" )
+        writeFileAtomic( fn, lambda f: f.write( "first" ) )
+        writeFileAtomic( fn, lambda f: f.write( "second" ) )
+        self.assertEqual( self.readFile( fn ), "second" )
+        self.assertEqual( os.listdir( os.path.dirname( fn ) ), [ "data.json" ] )
+
+    def test_failedWriteKeepsFile(self):
+        fn = os.path.join( self.tmpdir, "data.json" )
+        writeFileAtomic( fn, lambda f: f.write( "first" ) )
+        def fail( f ):
+            f.write( "partial" )
+            raise ValueError( "failed" )
+        self.assertRaises( ValueError, writeFileAtomic, fn, fail )
+        self.assertEqual( self.readFile( fn ), "first" )
+
+if __name__ == "__main__":
+    unittest.main()
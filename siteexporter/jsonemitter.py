@@ -0,0 +1,52 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import datetime
+
+from sharedemitter import SharedValueEmitter
+
+
+# The dates from the page attributes are written as ISO strings.
+def _jsonDefault( value ):
+    if isinstance( value, ( datetime.date, datetime.datetime ) ):
+        return value.isoformat()
+    raise TypeError( "Value '{}' can not be written to JSON.".format( value ) )
+
+
+def dumpJson( data ):
+    return json.dumps( data, sort_keys=True, default=_jsonDefault )
+
+
+class SharedJsonEmitter( SharedValueEmitter ):
+    """Serialize the extra attributes of pages into a JSON metadata file."""
+
+    def dump( self, extraAttrs ):
+        own = {}
+        parts = []
+        for k in sorted( extraAttrs.keys() ):
+            v = extraAttrs[k]
+            if k in self.sharedKeys and v is not None:
+                parts.append( self._getSharedText( k, v ) )
+            else:
+                own[k] = v
+
+        if len(own) > 0:
+            parts.insert( 0, dumpJson( own )[1:-1] )
+        return '{"sx": {' + ", ".join( parts ) + '}}'
+
+    def _dumpShared( self, key, value ):
+        return dumpJson( { key: value } )[1:-1]
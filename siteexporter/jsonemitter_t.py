@@ -0,0 +1,37 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import datetime
+import json
+import unittest
+from jsonemitter import SharedJsonEmitter
+
+class TestSharedJsonEmitter(unittest.TestCase):
+    def test_dumpIsValidJson(self):
+        tr = { "news-archive": "Archive" }
+        attrs = { "title": "a", "tr": tr, "navindex": [ { "id": "a", "link": "a.html" } ] }
+        emitter = SharedJsonEmitter()
+        self.assertEqual( json.loads( emitter.dump( attrs ) ), { "sx": attrs } )
+        self.assertEqual( json.loads( emitter.dump( { "tr": tr } ) ), { "sx": { "tr": tr } } )
+        self.assertEqual( emitter.hits, 1 )
+
+    def test_datesAreWrittenAsText(self):
+        emitter = SharedJsonEmitter()
+        text = emitter.dump( { "createDate": datetime.date( 2019, 7, 1 ) } )
+        self.assertEqual( json.loads( text ), { "sx": { "createDate": "2019-07-01" } } )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import json
+import hashlib
+
+import zim.formats
+
+from fileutil import writeFileAtomic
+from pageattributes import pageSourcePath
+from textutil import toBytes, hashText
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.manifest')
+
+
+def hashAttributes( attrs ):
+    return hashText( json.dumps( attrs, sort_keys=True, default=str ) )
+
+
+def hashFile( filename ):
+    h = hashlib.sha1()
+    with open( filename, "rb" ) as f:
+        for chunk in iter( lambda: f.read( 65536 ), b"" ):
+            h.update( chunk )
+    return h.hexdigest()
+
+
+# Hash the source of a Zim page and the list of its attachments.
+def pageSourceHash( notebook, zimPage ):
+    h = hashlib.sha1()
+    path = pageSourcePath( zimPage )
+    if path is not None:
+        with open( path, "rb" ) as f:
+            h.update( f.read() )
+    else:
+        h.update( toBytes( "".join( zimPage.dump( zim.formats.get_format('wiki') ) ) ) )
+
+    try:
+        attachDir = notebook.get_attachments_dir( zimPage ).path
+    except Exception:
+        attachDir = None
+    if attachDir is not None and os.path.isdir( attachDir ):
+        for fn in sorted( os.listdir( attachDir ) ):
+            # Subpages are stored in the same directory as the attachments.
+            fullname = os.path.join( attachDir, fn )
+            if fn.endswith( ".txt" ) or os.path.isdir( fullname ):
+                continue
+            st = os.stat( fullname )
+            h.update( toBytes( "{}:{}:{}\n".format( fn, st.st_size, st.st_mtime ) ) )
+
+    return h.hexdigest()
+
+
+class ExportManifest:
+    """The state of the pages from the previous export.
+
+    The manifest is stored next to the export directory.  For each page it
+    records the hash of the Zim source, the template and style used, the hash
+    of the generated YAML attributes and the hash of all the inputs that were
+    used to generate the HTML file.  A page whose inputs did not change since
+    the last export does not have to be processed again.
+
+    The manifest is removed from the disk when an export starts and written
+    again when the export completes so that an interrupted export can not
+    leave a manifest that does not match the files in the export directory.
+    """
+
+    version = 1
+
+    def __init__( self, filename, settings=None ):
+        self.filename = filename
+        # The export settings that affect the files in the export directory.
+        # The previous state is ignored if they change.
+        self.settings = settings if settings is not None else {}
+        self.previous = {}
+        self.pages = {}
+
+    def load( self ):
+        self.previous = {}
+        if not os.path.exists( self.filename ):
+            return
+        try:
+            with open( self.filename ) as f:
+                data = json.load( f )
+        except (IOError, ValueError) as e:
+            logger.warning( "Invalid manifest '{}': {}".format( self.filename, e ) )
+            return
+
+        if data.get( "version" ) != ExportManifest.version:
+            return
+        if data.get( "settings", {} ) != self.settings:
+            logger.debug( "Export settings changed. Exporting all pages." )
+            return
+        self.previous = data.get( "pages", {} )
+
+    def discard( self ):
+        if os.path.exists( self.filename ):
+            os.remove( self.filename )
+
+    def save( self ):
+        data = { "version": ExportManifest.version, "settings": self.settings,
+                "pages": self.pages }
+        writeFileAtomic( self.filename, lambda f: json.dump( data, f, indent=1, sort_keys=True ) )
+
+    def getPrevious( self, pageId, key ):
+        state = self.previous.get( pageId )
+        return state.get( key ) if state is not None else None
+
+    def setState( self, pageId, key, value ):
+        if not pageId in self.pages:
+            self.pages[pageId] = {}
+        self.pages[pageId][key] = value
@@ -17,16 +17,43 @@
 import os, re
 import datetime
 
-from processorfactory import Processor, ProcessorRegistry
+from processorfactory import Processor, ProcessorRegistry, PageChanges
+from sxpage import GeneratedPage
+from config import getIntValue
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.news')
+
+excerptLength = 300
+
+# The name of the generated page with the shared archive index of a news page
+archivePageName = "sx-archive"
+
+def getNewsPageSize( config ):
+    return max( 0, getIntValue( config, "newsPageSize", 0 ) )
+
+def isSharedArchiveIndex( config ):
+    mode = config.getValue( "newsArchiveMode", "page" ) if config is not None else "page"
+    return mode == "shared"
+
 
 # @p page - the page for which we are generating the excerpt
 # @p indexPage - the page where the excerpt page will be shown
 def getPageExcerpt( page, indexPage ):
-    mkdLines = page.getMarkdown()
+    return "".join(fixExcerptLinks(getRawExcerpt( page ), page, indexPage)).strip()
+
+
+# The excerpt lines are extracted once per page and shared by all the index
+# pages that show the page.
+def getRawExcerpt( page ):
+    if page.excerptLines is None:
+        page.excerptLines = extractExcerpt( page.iterMarkdown() )
+    return page.excerptLines
 
+
+def extractExcerpt( mkdLines ):
     brief = []
     inYaml = False
-    moreFound = False
     for line in mkdLines:
         if inYaml:
             if line.rstrip() in ( "---", "..." ):
@@ -39,17 +66,17 @@ def getPageExcerpt( page, indexPage ):
             if l.startswith( "#" ) or l.startswith( "```" ) or l.startswith("~~~"):
                 break
             if l == "<!--more-->":
-                moreFound = True
-                break
+                return brief
             brief.append( line )
 
-    if not moreFound:
-        lens = [len(l.strip()) for l in brief]
-        cumlens = [sum(lens[:i]) for i in range(len(lens))]
-        goodLens = [l for l in cumlens if l < 300]
-        brief =  brief[:len(goodLens)]
-
-    return "".join(fixExcerptLinks(brief, page, indexPage)).strip()
+    # Without the <!--more--> marker keep the lines that start before the
+    # excerpt length is reached.
+    total = 0
+    for i, line in enumerate( brief ):
+        if total >= excerptLength:
+            return brief[:i]
+        total += len(line.strip())
+    return brief
 
 
 def fixExcerptLinks( excerpt, page, indexPage ):
@@ -72,17 +99,18 @@ def fixExcerptLinks( excerpt, page, indexPage ):
 class PageInfoFinder:
     def __init__(self, pageProcessorFactory):
         self.pageProcessorFactory = pageProcessorFactory
+        self.inArchive = {}
 
     def _processorTypeName( self, page ):
         return self.pageProcessorFactory.getProcessorName( page.getPageType() )
 
+    # The membership is memoized so the ancestors of a page are visited once.
     def isInArchive( self, page ):
-        if self._processorTypeName(page) == NewsArchivePageProcessor.__name__:
-            return True
-
-        parents = page.getAncestors()
-        return any( [ self._processorTypeName(p) == NewsArchivePageProcessor.__name__
-            for p in parents if p is not None ] )
+        if not page.id in self.inArchive:
+            self.inArchive[page.id] = (
+                    self._processorTypeName(page) == NewsArchivePageProcessor.__name__
+                    or ( page.parent is not None and self.isInArchive( page.parent ) ) )
+        return self.inArchive[page.id]
 
     def isIndexPage( self, page ):
         return self._processorTypeName(page) == NewsIndexPageProcessor.__name__
@@ -130,10 +158,27 @@ class NewsIndexBuilder:
 
         return makeIndex( self.index )
 
+    # Render the index as a nested markdown list with links relative to @p page.
+    def getIndexMarkdownForPage( self, page ):
+        def escape( text ):
+            return re.sub( r'([\\\[\]])', r'\\\1', text )
+
+        lines = []
+        def addItems( items, level ):
+            for item in items:
+                lines.append( "{}- [{}]({})\n".format(
+                    "    " * level, escape( item["title"] ), item["link"] ) )
+                addItems( item.get( "items", [] ), level + 1 )
+
+        index = self.getIndexDictForPage( page )
+        if index is not None:
+            addItems( index.get( "items", [] ), 0 )
+        return lines
+
     def _buildIndex( self ):
         def makeEntries( page, parentEntry ):
             childs = [ p for p in page.children ]
-            childs.sort( key=lambda p: p.getCreationDate(), reverse=True )
+            childs.sort( key=lambda p: p.creationOrdinal, reverse=True )
 
             for child in childs:
                 entry = None
@@ -149,15 +194,28 @@ class NewsIndexBuilder:
         return rootEntry
 
 
+# The processors are created once per export so the information about the
+# pages is shared by all the digested pages.
+class NewsProcessor( Processor ):
+    def __init__( self ):
+        self.pageInfo = None
+
+    def getPageInfo( self, page ):
+        if self.pageInfo is None:
+            self.pageInfo = PageInfoFinder( page.exportData.pageTypeProcFactory )
+        return self.pageInfo
+
+
 # Create a list of published and not expired descendants.
-class NewsPageProcessor( Processor ):
-    def digest( self, page, pages, newPages ):
-        pageInfo = PageInfoFinder( page.exportData.pageTypeProcFactory )
+class NewsPageProcessor( NewsProcessor ):
+    def collect( self, page, pages ):
+        changes = PageChanges()
+        pageInfo = self.getPageInfo( page )
         childs = [ p for p in page.getDescendants() if p.isPublished() ]
         if len(childs) == 0:
-            return
+            return changes
 
-        childs.sort( key=lambda p: p.getCreationDate(), reverse=True )
+        childs.sort( key=lambda p: p.creationOrdinal, reverse=True )
 
         curDir = os.path.dirname( page.htmlFilename )
         def makeRelative( path ):
@@ -184,16 +242,42 @@ class NewsPageProcessor( Processor ):
 
             childAttrs.append( descr )
 
-        page.addExtraAttrs( { "news-activeitems": childAttrs } )
-        self._injectArchiveIndex( page, childs, newPages )
+        changes.addExtraAttrs( page, { "news-activeitems": childAttrs } )
+        self._injectArchiveIndex( page, childs, changes )
+        return changes
 
 
-    def _injectArchiveIndex( self, rootPage, childs, newPages ):
-        pageInfo = PageInfoFinder( rootPage.exportData.pageTypeProcFactory )
-        builder = NewsIndexBuilder(rootPage, pageInfo)
-        rootPage.addExtraAttrs( { "news-archiveindex": builder.getIndexDictForPage( rootPage ) } )
+    def _injectArchiveIndex( self, rootPage, childs, changes ):
+        builder = NewsIndexBuilder(rootPage, self.getPageInfo( rootPage ))
+        if isSharedArchiveIndex( rootPage.exportData.config ):
+            if self._addArchivePage( rootPage, childs, builder, changes ):
+                return
+
+        changes.addExtraAttrs( rootPage, { "news-archiveindex": builder.getIndexDictForPage( rootPage ) } )
         for page in childs:
-            page.addExtraAttrs( { "news-archiveindex": builder.getIndexDictForPage( page ) } )
+            changes.addExtraAttrs( page, { "news-archiveindex": builder.getIndexDictForPage( page ) } )
+
+
+    # Generate a page with the archive index. The news pages only link to it.
+    def _addArchivePage( self, rootPage, childs, builder, changes ):
+        if any( [ c.path[-1] == archivePageName for c in rootPage.children ] ):
+            logger.warning( "Page '{}:{}' exists. The archive index is added to every page.".format(
+                rootPage.id, archivePageName ) )
+            return False
+
+        pageType = "{}.archiveindex".format( rootPage.getPageType() )
+        archive = GeneratedPage( rootPage.path + [ archivePageName ], rootPage, rootPage.title,
+                { "type": pageType }, rootPage.exportData )
+        # The index changes with the newest item.
+        archive.creationOrdinal = max( [ rootPage.creationOrdinal ] + [ c.creationOrdinal for c in childs ] )
+        archive.publishOrdinal = archive.creationOrdinal
+        archive.setContent( builder.getIndexMarkdownForPage( archive ) )
+        changes.addPage( archive )
+
+        for page in [ rootPage ] + childs:
+            link = os.path.relpath( archive.htmlFilename, os.path.dirname( page.htmlFilename ) )
+            changes.addExtraAttrs( page, { "news-archive": { "id": rootPage.id, "link": link } } )
+        return True
 
 
 # Create a list of children items that are not themselves index pages.
@@ -201,15 +285,16 @@ class NewsPageProcessor( Processor ):
 # NOTE: Moving items between index pages will change their address and may
 # break links from other sites.  It would be better if index pages were
 # auto-generated from the publishDate.
-class NewsIndexPageProcessor( Processor ):
-    def digest( self, page, pages, newPages ):
-        pageInfo = PageInfoFinder( page.exportData.pageTypeProcFactory )
+class NewsIndexPageProcessor( NewsProcessor ):
+    def collect( self, page, pages ):
+        changes = PageChanges()
+        pageInfo = self.getPageInfo( page )
         childs = [ p for p in page.getDescendants()
             if not pageInfo.isIndexPage(p) and p.isPublished() ]
         if len(childs) == 0:
-            return
+            return changes
 
-        childs.sort( key=lambda p: p.getCreationDate(), reverse=True )
+        childs.sort( key=lambda p: p.creationOrdinal, reverse=True )
 
         curDir = os.path.dirname( page.htmlFilename )
         def makeRelative( path ):
@@ -231,7 +316,49 @@ class NewsIndexPageProcessor( Processor ):
 
             childAttrs.append( descr )
 
-        page.addExtraAttrs( { "news-indexitems": childAttrs } )
+        pageSize = getNewsPageSize( page.exportData.config )
+        if pageSize == 0 or len(childAttrs) <= pageSize:
+            changes.addExtraAttrs( page, { "news-indexitems": childAttrs } )
+            return changes
+
+        self._paginate( page, pages, childAttrs, pageSize, changes )
+        return changes
+
+
+    # Split the items between the index page and the generated pages
+    # <name>-2, <name>-3, ... in the same directory.  The links in the items
+    # are valid on all the pages.
+    def _paginate( self, page, pages, childAttrs, pageSize, changes ):
+        if pageSize <= 0:
+            changes.addExtraAttrs( page, { "news-indexitems": childAttrs } )
+            return
+
+        chunks = [ childAttrs[i:i+pageSize] for i in range( 0, len(childAttrs), pageSize ) ]
+        paths = [ page.path[:-1] + [ "{}-{}".format( page.path[-1], i ) ]
+                for i in range( 2, len(chunks) + 1 ) ]
+        for path in paths:
+            if pages.getPage( ":".join( path ) ) is not None:
+                logger.warning( "Page '{}' exists. The index '{}' is not split.".format(
+                    ":".join( path ), page.id ) )
+                changes.addExtraAttrs( page, { "news-indexitems": childAttrs } )
+                return
+
+        attrs = dict( [ (k,v) for k,v in page.attrs.items() if k != "menu" ] )
+        attrs["type"] = page.getPageType()
+        indexPages = [ page ]
+        for path in paths:
+            indexPage = GeneratedPage( path, page.parent, page.title, attrs, page.exportData )
+            indexPage.setContent( [] )
+            indexPages.append( indexPage )
+            changes.addPage( indexPage )
+
+        for i, indexPage in enumerate( indexPages ):
+            pagination = { "page": i + 1, "pages": len(indexPages) }
+            if i > 0:
+                pagination["prev"] = os.path.basename( indexPages[i-1].htmlFilename )
+            if i + 1 < len(indexPages):
+                pagination["next"] = os.path.basename( indexPages[i+1].htmlFilename )
+            changes.addExtraAttrs( indexPage, { "news-indexitems": chunks[i], "news-pagination": pagination } )
 
 
 # NOTE: This processor may not be necessary
@@ -244,7 +371,9 @@ class Register(ProcessorRegistry):
         pageTypeProcFactory.registerPageType( "news", NewsPageProcessor.__name__ )
         pageTypeProcFactory.registerPageType( "news.index", NewsIndexPageProcessor.__name__ )
         pageTypeProcFactory.registerPageType( "news.archive", NewsArchivePageProcessor.__name__ )
+        pageTypeProcFactory.registerPageType( "news.archiveindex", NewsArchivePageProcessor.__name__ )
         pageTypeProcFactory.registerPageType( "blog", NewsPageProcessor.__name__ )
         pageTypeProcFactory.registerPageType( "blog.index", NewsIndexPageProcessor.__name__ )
         pageTypeProcFactory.registerPageType( "blog.archive", NewsArchivePageProcessor.__name__ )
+        pageTypeProcFactory.registerPageType( "blog.archiveindex", NewsArchivePageProcessor.__name__ )
 
@@ -17,9 +17,10 @@
 import datetime
 import unittest
 import exportdata
-from sxpage import MarkdownPage, findPageParents
-from processorfactory import PageTypeProcessorFactory, ProcessorRegistry
+from sxpage import MarkdownPage, PageRegistry, findPageParents
+from processorfactory import PageTypeProcessorFactory, ProcessorRegistry, PageChanges
 import news
+from testsupport import TestConfig, TestExportData
 
 class TestNotebook:
     def __init__(self):
@@ -191,5 +192,149 @@ class TestNewsIndexBuilder(unittest.TestCase):
         self.assertEqual( ch2["id"], "announcements:2019" )
         self.assertEqual( len(ch2["items"]), 2)
 
+    def test_createNewsIndexMarkdown(self):
+        # -- GIVEN
+        notebook = TestNotebook()
+        zimRoot = createNewsStructure( notebook )
+        mkdPages = [ MarkdownPage( p, None ) for p in notebook.pages if p.exists() ]
+        root = [ p for p in mkdPages if p.zimPage == zimRoot ][0]
+        findPageParents( mkdPages )
+
+        procFactory = PageTypeProcessorFactory()
+        ProcessorRegistry.registerPageTypes(procFactory)
+        infoFinder = news.PageInfoFinder(procFactory)
+        builder = news.NewsIndexBuilder(root, infoFinder)
+
+        # -- WHEN
+        lines = builder.getIndexMarkdownForPage( root )
+
+        # -- THEN
+        self.assertEqual( len(lines), 6 )
+        self.assertTrue( lines[0].startswith( "- [" ) )
+        self.assertTrue( lines[2].startswith( "    - [" ) )
+
+class TestSharedArchiveIndex(unittest.TestCase):
+    def test_archivePageContainsIndex(self):
+        notebook = TestNotebook()
+        zimRoot = createNewsStructure( notebook )
+        exportData = TestExportData( TestConfig( { "newsArchiveMode": "shared" } ) )
+        mkdPages = [ MarkdownPage( p, exportData ) for p in notebook.pages if p.exists() ]
+        for page in mkdPages:
+            page.setMarkdown( page.zimPage.content )
+        findPageParents( mkdPages )
+        pages = PageRegistry( mkdPages )
+        pages.resolveDerivedValues()
+        root = [ p for p in mkdPages if p.zimPage == zimRoot ][0]
+
+        changes = news.NewsPageProcessor().collect( root, pages )
+
+        self.assertEqual( len(changes.newPages), 1 )
+        archive = changes.newPages[0]
+        self.assertEqual( archive.id, "announcements:sx-archive" )
+        self.assertEqual( archive.getPageType(), "news.archiveindex" )
+        lines = list( archive.getMarkdown() )
+        self.assertEqual( len(lines), 6 )
+        self.assertEqual( lines[0], "- [Title](2017.html)\n" )
+        self.assertIsNotNone( archive.sourceHash )
+
+        links = [ attrs["news-archive"] for p, attrs in changes.attrs if p == root and "news-archive" in attrs ]
+        self.assertEqual( links, [ { "id": "announcements", "link": "announcements/sx-archive.html" } ] )
+
+class TestNewsPagination(unittest.TestCase):
+    def createIndex(self, itemCount, pageSize):
+        def eols(lines):
+            return [ l + "\n" for l in lines ]
+
+        index = TestZimPage( "news", eols( [ "---", "type: news.index", "---" ] ) )
+        items = []
+        for i in range(itemCount):
+            createDate = datetime.date( 2018, 1, 1 ) + datetime.timedelta( days=i )
+            items.append( TestZimPage( "item{}".format( i ),
+                eols( [ "---", "createDate: {}".format( createDate.isoformat() ), "---", "Item {}".format( i ) ] ) ) )
+        index.addChilds( items )
+
+        exportData = TestExportData( TestConfig( { "newsPageSize": pageSize } ) )
+        mkdPages = [ MarkdownPage( p, exportData ) for p in [ index ] + items ]
+        for page in mkdPages:
+            page.setMarkdown( page.zimPage.content )
+        findPageParents( mkdPages )
+        pages = PageRegistry( mkdPages )
+        pages.resolveDerivedValues()
+        return mkdPages[0], pages
+
+    def collect(self, itemCount, pageSize):
+        page, pages = self.createIndex( itemCount, pageSize )
+        changes = news.NewsIndexPageProcessor().collect( page, pages )
+        attrs = {}
+        for p, attrDict in changes.attrs:
+            attrs.setdefault( p.id, {} ).update( attrDict )
+        return [ page ] + changes.newPages, attrs
+
+    def itemIds(self, attrs):
+        return [ item["id"] for item in attrs["news-indexitems"] ]
+
+    def test_itemsAreSplitBetweenPages(self):
+        indexPages, attrs = self.collect( 6, 2 )
+        self.assertEqual( [ p.id for p in indexPages ], [ "news", "news-2", "news-3" ] )
+        self.assertEqual( self.itemIds( attrs["news"] ), [ "news:item5", "news:item4" ] )
+        self.assertEqual( self.itemIds( attrs["news-2"] ), [ "news:item3", "news:item2" ] )
+        self.assertEqual( self.itemIds( attrs["news-3"] ), [ "news:item1", "news:item0" ] )
+        for i, p in enumerate( indexPages ):
+            self.assertEqual( attrs[p.id]["news-pagination"]["page"], i + 1 )
+            self.assertEqual( attrs[p.id]["news-pagination"]["pages"], 3 )
+
+    def test_lastPageIsPartial(self):
+        indexPages, attrs = self.collect( 5, 2 )
+        self.assertEqual( len(indexPages), 3 )
+        self.assertEqual( self.itemIds( attrs["news-3"] ), [ "news:item0" ] )
+
+    def test_prevNextLinks(self):
+        indexPages, attrs = self.collect( 5, 2 )
+        first = attrs["news"]["news-pagination"]
+        middle = attrs["news-2"]["news-pagination"]
+        last = attrs["news-3"]["news-pagination"]
+        self.assertNotIn( "prev", first )
+        self.assertEqual( first["next"], "news-2.html" )
+        self.assertEqual( middle["prev"], "news.html" )
+        self.assertEqual( middle["next"], "news-3.html" )
+        self.assertEqual( last["prev"], "news-2.html" )
+        self.assertNotIn( "next", last )
+
+    def test_noSplitWhenItemsFit(self):
+        indexPages, attrs = self.collect( 2, 2 )
+        self.assertEqual( len(indexPages), 1 )
+        self.assertEqual( len(attrs["news"]["news-indexitems"]), 2 )
+        self.assertNotIn( "news-pagination", attrs["news"] )
+
+    def test_pageSizeFromText(self):
+        indexPages, attrs = self.collect( 5, "2" )
+        self.assertEqual( len(indexPages), 3 )
+
+    def test_paginateWithoutPageSize(self):
+        page, pages = self.createIndex( 3, 0 )
+        childAttrs = [ { "id": "a" }, { "id": "b" }, { "id": "c" } ]
+        changes = PageChanges()
+        news.NewsIndexPageProcessor()._paginate( page, pages, childAttrs, 0, changes )
+        self.assertEqual( changes.newPages, [] )
+        self.assertEqual( changes.attrs, [ (page, { "news-indexitems": childAttrs }) ] )
+
+    def test_noSplitWhenPageSizeIsNotPositive(self):
+        for pageSize in [ 0, -1, "many" ]:
+            indexPages, attrs = self.collect( 5, pageSize )
+            self.assertEqual( len(indexPages), 1 )
+            self.assertEqual( len(attrs["news"]["news-indexitems"]), 5 )
+            self.assertNotIn( "news-pagination", attrs["news"] )
+
+class TestExcerpt(unittest.TestCase):
+    def test_excerptStopsAtLength(self):
+        lines = [ "---\n", "title: t\n", "---\n" ] + [ "x" * 100 + "\n" ] * 5
+        brief = news.extractExcerpt( iter(lines) )
+        self.assertEqual( len(brief), 3 )
+
+    def test_excerptStopsAtMoreMarker(self):
+        lines = [ "x" * 100 + "\n" ] * 5 + [ "<!--more-->\n", "rest\n" ]
+        brief = news.extractExcerpt( iter(lines) )
+        self.assertEqual( len(brief), 5 )
+
 if __name__ == "__main__":
     unittest.main()
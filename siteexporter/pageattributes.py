@@ -14,18 +14,63 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os, io, re
+import datetime
+import dateutil.parser as dateparser
 import zim.formats
 
 # REQUIRE: pyyaml
 import yaml
 
-# Extract the YAML attributes from a page
+# The path of the file that stores the source of a Zim page or None if the
+# page is not stored in a file.
+def pageSourcePath( page ):
+    for attr in ( "source_file", "source" ):
+        source = getattr( page, attr, None )
+        path = getattr( source, "path", None ) if source is not None else None
+        if path is not None and os.path.isfile( path ):
+            return path
+    return None
 
-def loadYamlAttributes( page ):
-    zimLines = page.dump(zim.formats.get_format('wiki'))
+
+# Read the headers at the beginning of a Zim page source file.
+def readPageHeaders( path ):
+    headers = {}
+    with io.open( path, encoding="utf-8" ) as f:
+        for line in f:
+            if line.strip() == "" or not ":" in line:
+                break
+            name, value = line.split( ":", 1 )
+            headers[name.strip()] = value.strip()
+    return headers
+
+
+rxIsoDate = re.compile( r"^\s*(\d{4})-(\d{2})-(\d{2})(?:[T ]|\s*$)" )
+
+# Parse the value of the Creation-Date header of a Zim page.  The date part of
+# an ISO 8601 value is used directly, other formats are parsed by dateutil.
+def parseCreationDate( text ):
+    if text is None:
+        return None
+    mo = rxIsoDate.match( text )
+    if mo is not None:
+        try:
+            return datetime.date( int(mo.group(1)), int(mo.group(2)), int(mo.group(3)) )
+        except ValueError:
+            pass
+    return datetime.date.fromordinal( dateparser.parse( text ).toordinal() )
+
+
+# Use the libyaml parser if it is available.
+YamlLoader = getattr( yaml, "CSafeLoader", yaml.SafeLoader )
+
+
+# Collect the lines of the first YAML block.  The iteration stops at the end
+# of the block so the rest of a file is never read.
+def _extractYamlBlock( lines ):
     yamltext = []
     inYaml = False
-    for line in zimLines:
+    for line in lines:
         if inYaml:
             if line.rstrip() in ( "---", "..." ):
                 break
@@ -34,7 +79,21 @@ def loadYamlAttributes( page ):
             if line.rstrip() == "---":
                 inYaml = True
 
+    return yamltext
+
+
+# Extract the YAML attributes from a page.  The attributes are read from the
+# source file of the page if it exists, otherwise from the page dumped in the
+# wiki format.
+def loadYamlAttributes( page ):
+    path = pageSourcePath( page )
+    if path is not None:
+        with io.open( path, encoding="utf-8" ) as f:
+            yamltext = _extractYamlBlock( f )
+    else:
+        yamltext = _extractYamlBlock( page.dump(zim.formats.get_format('wiki')) )
+
     if len(yamltext) > 0:
-        return yaml.safe_load( "".join(yamltext) )
+        return yaml.load( "".join(yamltext), Loader=YamlLoader )
 
     return {}
@@ -0,0 +1,98 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+import yaml
+import pageattributes
+from pageattributes import parseCreationDate, readPageHeaders, loadYamlAttributes, _extractYamlBlock
+
+class TestCreationDate(unittest.TestCase):
+    def test_dateOnly(self):
+        self.assertEqual( parseCreationDate( "2018-10-11" ), datetime.date( 2018, 10, 11 ) )
+
+    def test_dateTime(self):
+        self.assertEqual( parseCreationDate( "2018-10-11T12:13:14" ), datetime.date( 2018, 10, 11 ) )
+        self.assertEqual( parseCreationDate( "2018-10-11 12:13:14" ), datetime.date( 2018, 10, 11 ) )
+
+    def test_timezoneKeepsLocalDate(self):
+        self.assertEqual( parseCreationDate( "2018-10-11T23:30:00+02:00" ), datetime.date( 2018, 10, 11 ) )
+        self.assertEqual( parseCreationDate( "2018-10-11T00:30:00-05:00" ), datetime.date( 2018, 10, 11 ) )
+
+    def test_otherFormatsFallBack(self):
+        self.assertEqual( parseCreationDate( "11 October 2018 12:13" ), datetime.date( 2018, 10, 11 ) )
+        self.assertEqual( parseCreationDate( "2018/10/11" ), datetime.date( 2018, 10, 11 ) )
+
+    def test_invalidDate(self):
+        self.assertIsNone( parseCreationDate( None ) )
+        self.assertRaises( ValueError, parseCreationDate, "2018-02-30T12:00:00" )
+        self.assertRaises( ValueError, parseCreationDate, "yesterday" )
+
+class TestSource:
+    def __init__(self, path):
+        self.path = path
+
+class TestZimPage:
+    def __init__(self, path):
+        self.source_file = TestSource( path )
+
+class TestYamlAttributes(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.loader = pageattributes.YamlLoader
+
+    def tearDown(self):
+        pageattributes.YamlLoader = self.loader
+        shutil.rmtree( self.tmpdir )
+
+    def writePage(self, lines):
+        fn = os.path.join( self.tmpdir, "page.txt" )
+        with open( fn, "w" ) as f:
+            f.write( "".join( lines ) )
+        return TestZimPage( fn )
+
+    def pageWithYaml(self):
+        return self.writePage( [ "Content-Type: text/x-zim-wiki\n", "Creation-Date: 2018-10-11T12:13:14+02:00\n",
+            "\n", "====== Page ======\n", "---\n", "title: Page\n", "tags: [a, b]\n", "---\n", "Text\n" ] )
+
+    @unittest.skipUnless( hasattr( yaml, "CSafeLoader" ), "libyaml is not available" )
+    def test_libyamlLoader(self):
+        pageattributes.YamlLoader = yaml.CSafeLoader
+        self.assertEqual( loadYamlAttributes( self.pageWithYaml() ), { "title": "Page", "tags": [ "a", "b" ] } )
+
+    def test_pythonLoader(self):
+        pageattributes.YamlLoader = yaml.SafeLoader
+        self.assertEqual( loadYamlAttributes( self.pageWithYaml() ), { "title": "Page", "tags": [ "a", "b" ] } )
+
+    def test_pageWithoutYaml(self):
+        page = self.writePage( [ "Content-Type: text/x-zim-wiki\n", "\n", "Text\n" ] )
+        self.assertEqual( loadYamlAttributes( page ), {} )
+
+    def test_extractionStopsAtEndOfBlock(self):
+        lines = iter( [ "---\n", "a: 1\n", "...\n", "rest\n" ] )
+        self.assertEqual( _extractYamlBlock( lines ), [ "a: 1\n" ] )
+        self.assertEqual( list( lines ), [ "rest\n" ] )
+
+    def test_readPageHeaders(self):
+        headers = readPageHeaders( self.pageWithYaml().source_file.path )
+        self.assertEqual( headers, { "Content-Type": "text/x-zim-wiki",
+            "Creation-Date": "2018-10-11T12:13:14+02:00" } )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import json
+import time
+import shutil
+import subprocess as subp
+
+from textutil import hashText
+from fileutil import writeFileAtomic
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.pandoccache')
+
+
+_pandocVersions = {}
+
+def getPandocVersion( pandoccmd ):
+    if not pandoccmd in _pandocVersions:
+        try:
+            proc = subp.Popen( [ pandoccmd, "--version" ], stdout=subp.PIPE, stderr=subp.PIPE )
+            out, err = proc.communicate()
+            version = out.splitlines()[0] if len(out) > 0 else b""
+        except OSError:
+            version = b""
+        _pandocVersions[pandoccmd] = version
+    return _pandocVersions[pandoccmd]
+
+
+class PandocCache:
+    """A content-addressed cache of HTML files generated by Pandoc.
+
+    The cached files are named after the hash of all the inputs of the
+    conversion.  When the total size of the cache exceeds @p maxSize bytes the
+    least recently used files are removed.  The fetched files are hard-linked
+    to the output so their modification time can not mark them as used.  The
+    times of use are kept in a separate access record, instead.
+    """
+
+    accessName = "access.json"
+
+    def __init__( self, cacheDir, maxSize ):
+        self.cacheDir = cacheDir
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.used = {} # key -> time of use in this export
+
+    def makeKey( self, *parts ):
+        return hashText( *parts )
+
+    def _cachedFilename( self, key ):
+        return os.path.join( self.cacheDir, key[:2], key )
+
+    # Put the cached output to @p outpath.  Return False if it is not cached.
+    def fetch( self, key, outpath ):
+        cached = self._cachedFilename( key )
+        if not os.path.exists( cached ):
+            self.misses += 1
+            return False
+
+        outdir = os.path.dirname( outpath )
+        if not os.path.exists( outdir ):
+            os.makedirs( outdir )
+        if os.path.exists( outpath ):
+            os.remove( outpath )
+        try:
+            os.link( cached, outpath )
+        except (OSError, AttributeError):
+            shutil.copyfile( cached, outpath )
+
+        self.used[key] = time.time()
+        self.hits += 1
+        return True
+
+    # Store a copy of the generated @p outpath.  A copy is made so that the
+    # cache is not modified when the output file is overwritten.
+    def store( self, key, outpath ):
+        if not os.path.exists( outpath ):
+            return
+        def copyOutput( f ):
+            with open( outpath, "rb" ) as fin:
+                shutil.copyfileobj( fin, f )
+        writeFileAtomic( self._cachedFilename( key ), copyOutput, binary=True )
+        self.used[key] = time.time()
+
+    def _loadAccessRecord( self ):
+        fn = os.path.join( self.cacheDir, PandocCache.accessName )
+        if not os.path.exists( fn ):
+            return {}
+        try:
+            with open( fn ) as f:
+                return json.load( f )
+        except (IOError, ValueError) as e:
+            logger.warning( "Invalid Pandoc cache access record '{}': {}".format( fn, e ) )
+            return {}
+
+    def _saveAccessRecord( self, access ):
+        fn = os.path.join( self.cacheDir, PandocCache.accessName )
+        writeFileAtomic( fn, lambda f: json.dump( access, f ) )
+
+    def evict( self ):
+        if not os.path.exists( self.cacheDir ):
+            return
+
+        access = self._loadAccessRecord()
+        access.update( self.used )
+
+        # A file that is not in the access record was last used when it was
+        # stored.
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk( self.cacheDir ):
+            if root == self.cacheDir:
+                continue
+            for fn in files:
+                path = os.path.join( root, fn )
+                st = os.stat( path )
+                entries.append( (access.get( fn, st.st_mtime ), st.st_size, fn, path) )
+                total += st.st_size
+
+        entries.sort()
+        removed = 0
+        for used, size, key, path in entries:
+            if total <= self.maxSize:
+                break
+            os.remove( path )
+            total -= size
+            removed += 1
+
+        kept = [ key for used, size, key, path in entries[removed:] ]
+        self._saveAccessRecord( dict([ (key, access[key]) for key in kept if key in access ]) )
+
+        logger.debug( "Removed {} files from the Pandoc cache.".format( removed ) )
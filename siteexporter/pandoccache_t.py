@@ -0,0 +1,107 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from pandoccache import PandocCache
+
+class TestPandocCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cacheDir = os.path.join( self.tmpdir, "cache" )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writeOutput(self, name, text):
+        fn = os.path.join( self.tmpdir, name )
+        with open( fn, "w" ) as f:
+            f.write( text )
+        return fn
+
+    def test_fetchStoredOutput(self):
+        # -- GIVEN
+        cache = PandocCache( self.cacheDir, 1000 )
+        key = cache.makeKey( "pandoc 2.5", "page.markdown", "text" )
+        cache.store( key, self.writeOutput( "page.html", "<p>text</p>" ) )
+        outpath = os.path.join( self.tmpdir, "out", "page.html" )
+
+        # -- WHEN
+        found = cache.fetch( key, outpath )
+
+        # -- THEN
+        self.assertTrue( found )
+        with open( outpath ) as f:
+            self.assertEqual( f.read(), "<p>text</p>" )
+
+    def test_fetchMissingOutput(self):
+        cache = PandocCache( self.cacheDir, 1000 )
+        outpath = os.path.join( self.tmpdir, "page.html" )
+        self.assertFalse( cache.fetch( cache.makeKey( "other" ), outpath ) )
+        self.assertFalse( os.path.exists( outpath ) )
+
+    def test_keyDependsOnAllParts(self):
+        cache = PandocCache( self.cacheDir, 1000 )
+        self.assertNotEqual( cache.makeKey( "a", "bc" ), cache.makeKey( "ab", "c" ) )
+
+    # Store the entries in an earlier export.
+    def storeOldEntries(self, keys):
+        cache = PandocCache( self.cacheDir, 25 )
+        outpath = self.writeOutput( "page.html", "x" * 10 )
+        for i, key in enumerate( keys ):
+            cache.store( key, outpath )
+            fn = cache._cachedFilename( key )
+            os.utime( fn, (1000 + i, 1000 + i) )
+        return PandocCache( self.cacheDir, 25 )
+
+    def test_evictLeastRecentlyUsed(self):
+        # -- GIVEN
+        cache = self.storeOldEntries( [ "aa01", "aa02", "aa03" ] )
+
+        # -- WHEN
+        cache.evict()
+
+        # -- THEN
+        self.assertFalse( os.path.exists( cache._cachedFilename( "aa01" ) ) )
+        self.assertTrue( os.path.exists( cache._cachedFilename( "aa02" ) ) )
+        self.assertTrue( os.path.exists( cache._cachedFilename( "aa03" ) ) )
+
+    def test_fetchMarksEntryAsUsed(self):
+        # -- GIVEN
+        cache = self.storeOldEntries( [ "aa01", "aa02", "aa03" ] )
+        outpath = os.path.join( self.tmpdir, "out", "page.html" )
+
+        # -- WHEN
+        self.assertTrue( cache.fetch( "aa01", outpath ) )
+        cache.evict()
+
+        # -- THEN
+        # The output keeps the time of the cached file.
+        self.assertEqual( os.stat( outpath ).st_mtime, 1000 )
+        self.assertTrue( os.path.exists( cache._cachedFilename( "aa01" ) ) )
+        self.assertFalse( os.path.exists( cache._cachedFilename( "aa02" ) ) )
+        self.assertTrue( os.path.exists( cache._cachedFilename( "aa03" ) ) )
+
+        # The use is remembered in the next export.
+        cache = PandocCache( self.cacheDir, 15 )
+        cache.evict()
+        self.assertTrue( os.path.exists( cache._cachedFilename( "aa01" ) ) )
+        self.assertFalse( os.path.exists( cache._cachedFilename( "aa03" ) ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import subprocess as subp
+
+from workerpool import mapParallel
+from textutil import toBytes
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.pandocrunner')
+
+
+class PandocJob:
+    def __init__( self, page, command, outpath, input=None, template=None, options=None ):
+        self.page = page
+        self.command = command
+        self.outpath = outpath
+        # The markdown text that is sent to Pandoc through stdin
+        self.input = input
+        # The template and the options for a conversion with pandoc-server
+        self.template = template
+        self.options = options if options is not None else {}
+        # The text of the metadata file passed to Pandoc with --metadata-file
+        self.metadata = None
+        # The name of the input file.  Pandoc uses it as the default page title.
+        self.sourcefile = "-" if input is not None else None
+        self.cacheKey = None
+
+
+class PandocResult:
+    def __init__( self, job, returncode, stderr ):
+        self.job = job
+        self.returncode = returncode
+        self.stderr = stderr
+
+    @property
+    def page( self ):
+        return self.job.page
+
+    def failed( self ):
+        return self.returncode != 0
+
+
+class PandocRunner:
+    """Run Pandoc conversions in a bounded pool of worker threads.
+
+    Each conversion is a separate Pandoc process.  The threads only wait for
+    the processes to finish so the number of jobs limits the number of Pandoc
+    processes that run at the same time.
+    """
+
+    def __init__( self, jobs=1 ):
+        self.jobs = jobs
+
+    def run( self, jobs ):
+        return mapParallel( self._runJob, jobs, self.jobs )
+
+    def _runJob( self, job ):
+        logger.debug( " ".join(job.command) )
+        try:
+            if job.input is None:
+                proc = subp.Popen( job.command, stdout=subp.PIPE, stderr=subp.PIPE )
+                out, err = proc.communicate()
+            else:
+                proc = subp.Popen( job.command, stdin=subp.PIPE, stdout=subp.PIPE, stderr=subp.PIPE )
+                out, err = proc.communicate( toBytes( job.input ) )
+        except OSError as e:
+            return PandocResult( job, None, str(e) )
+
+        if not isinstance( err, str ):
+            err = err.decode( "utf-8", "replace" )
+        return PandocResult( job, proc.returncode, err.strip() )
@@ -0,0 +1,70 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pandocrunner import PandocRunner, PandocJob
+
+class TestPage:
+    def __init__(self, id):
+        self.id = id
+
+class TestPandocRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    # A job that runs a Python script instead of Pandoc.
+    def makeJob(self, name, script, input=None):
+        outpath = os.path.join( self.tmpdir, name + ".html" )
+        command = [ sys.executable, "-c", script, outpath ]
+        return PandocJob( TestPage( name ), command, outpath, input )
+
+    def test_resultsOfEachPage(self):
+        jobs = [
+            self.makeJob( "ok", "import sys; open( sys.argv[1], 'w' ).write( 'html' )" ),
+            self.makeJob( "warn", "import sys; sys.stderr.write( 'a warning\\n' )" ),
+            self.makeJob( "fail", "import sys; sys.stderr.write( 'an error' ); sys.exit( 3 )" ),
+            ]
+        results = PandocRunner( 2 ).run( jobs )
+
+        self.assertEqual( [ r.page.id for r in results ], [ "ok", "warn", "fail" ] )
+        self.assertEqual( [ r.returncode for r in results ], [ 0, 0, 3 ] )
+        self.assertEqual( [ r.stderr for r in results ], [ "", "a warning", "an error" ] )
+        self.assertEqual( [ r.failed() for r in results ], [ False, False, True ] )
+        self.assertTrue( os.path.exists( jobs[0].outpath ) )
+
+    def test_inputIsSentToStdin(self):
+        job = self.makeJob( "stdin", "import sys; open( sys.argv[1], 'w' ).write( sys.stdin.read() )", "# Text\n" )
+        result = PandocRunner().run( [ job ] )[0]
+        self.assertFalse( result.failed() )
+        with open( job.outpath ) as f:
+            self.assertEqual( f.read(), "# Text\n" )
+
+    def test_missingCommand(self):
+        job = PandocJob( TestPage( "page" ), [ os.path.join( self.tmpdir, "pandoc" ) ], "page.html" )
+        result = PandocRunner().run( [ job ] )[0]
+        self.assertIsNone( result.returncode )
+        self.assertTrue( result.failed() )
+        self.assertTrue( len(result.stderr) > 0 )
+
+if __name__ == "__main__":
+    unittest.main()
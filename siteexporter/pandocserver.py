@@ -0,0 +1,180 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import json
+import time
+import socket
+import threading
+import subprocess as subp
+try:
+    from urllib2 import urlopen, Request, URLError
+    from httplib import HTTPException
+except ImportError:
+    from urllib.request import urlopen, Request
+    from urllib.error import URLError
+    from http.client import HTTPException
+
+from workerpool import mapParallel
+from textutil import toBytes
+from pandocrunner import PandocResult
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.pandocserver')
+
+pandocservercmd = "pandoc-server"
+
+
+def _findFreePort():
+    sock = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+    try:
+        sock.bind( ( "127.0.0.1", 0 ) )
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class PandocServer:
+    """A pandoc-server process that runs on localhost during an export."""
+
+    def __init__( self, pandoccmd, startTimeout=10, requestTimeout=60 ):
+        self.pandoccmd = pandoccmd
+        self.startTimeout = startTimeout
+        self.requestTimeout = requestTimeout
+        self.proc = None
+        self.devnull = None
+        self.url = None
+
+    def start( self ):
+        port = _findFreePort()
+        commands = [ [ pandocservercmd, "--port", str(port) ],
+                [ self.pandoccmd, "server", "--port", str(port) ] ]
+        self.devnull = open( os.devnull, "w" )
+        for command in commands:
+            try:
+                self.proc = subp.Popen( command, stdout=self.devnull, stderr=self.devnull )
+                break
+            except OSError:
+                self.proc = None
+
+        if self.proc is None:
+            self.stop()
+            return False
+
+        self.url = "http://127.0.0.1:{}".format( port )
+        deadline = time.time() + self.startTimeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                urlopen( self.url + "/version", timeout=1 ).read()
+                return True
+            except (URLError, socket.error):
+                time.sleep( 0.1 )
+
+        self.stop()
+        return False
+
+    def stop( self ):
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.terminate()
+                self.proc.wait()
+            self.proc = None
+        if self.devnull is not None:
+            self.devnull.close()
+            self.devnull = None
+
+    # Convert the document with the parameters @p params.  Return the output
+    # and the list of messages that Pandoc reported.
+    def convert( self, params ):
+        request = Request( self.url, toBytes( json.dumps( params ) ),
+                { "Content-Type": "application/json", "Accept": "application/json" } )
+        response = urlopen( request, timeout=self.requestTimeout ).read()
+        response = json.loads( response.decode( "utf-8" ) )
+        output = response.get( "output", "" )
+        messages = [ m.get( "message", "" ) for m in response.get( "messages", [] ) ]
+        return output, messages
+
+
+class PandocServerRunner:
+    """Send Pandoc conversions to a pool of pandoc-server processes.
+
+    The jobs are distributed between the servers in round-robin order.  If a
+    server can not be reached or it does not respond in time, the job is
+    converted with @p fallbackRunner.
+    """
+
+    def __init__( self, servers, fallbackRunner, jobs=1 ):
+        self.servers = servers
+        self.fallbackRunner = fallbackRunner
+        self.jobs = jobs
+        self.templates = {}
+        self.lock = threading.Lock()
+        self.nextServer = 0
+
+    @staticmethod
+    def startServers( pandoccmd, count, requestTimeout=60 ):
+        servers = []
+        for i in range(count):
+            server = PandocServer( pandoccmd, requestTimeout=requestTimeout )
+            if not server.start():
+                logger.warning( "Could not start pandoc-server." )
+                break
+            servers.append( server )
+        return servers
+
+    def run( self, jobs ):
+        return mapParallel( self._runJob, jobs, self.jobs )
+
+    def _getTemplate( self, filename ):
+        with self.lock:
+            if not filename in self.templates:
+                with open( filename ) as f:
+                    self.templates[filename] = f.read()
+            return self.templates[filename]
+
+    def _getServer( self ):
+        with self.lock:
+            server = self.servers[ self.nextServer % len(self.servers) ]
+            self.nextServer += 1
+            return server
+
+    def _runJob( self, job ):
+        params = dict( job.options )
+        params["text"] = job.input if job.input is not None else "".join( job.page.getMarkdown() )
+        # The server can not read the metadata file. The JSON metadata is a
+        # valid YAML block so it is added in front of the text.
+        if job.metadata is not None:
+            params["text"] = "---\n{}\n---\n\n{}".format( job.metadata, params["text"] )
+        if job.template is not None:
+            params["template"] = self._getTemplate( job.template )
+        # The server does not know the name of the input file.  Pandoc uses
+        # the variable sourcefile for the default page title.
+        if job.sourcefile is not None:
+            variables = dict( params.get( "variables", {} ) )
+            variables["sourcefile"] = job.sourcefile
+            params["variables"] = variables
+
+        try:
+            output, messages = self._getServer().convert( params )
+        except (URLError, HTTPException, socket.error, ValueError) as e:
+            logger.debug( "pandoc-server failed on page '{}': {}".format( job.page.id, e ) )
+            return self.fallbackRunner.run( [ job ] )[0]
+
+        with open( job.outpath, "wb" ) as f:
+            f.write( toBytes( output ) )
+        return PandocResult( job, 0, "\n".join( messages ) )
@@ -0,0 +1,121 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+import pandocserver
+from pandocserver import PandocServer, PandocServerRunner, URLError
+from pandocrunner import PandocJob, PandocResult
+
+class TestPage:
+    def __init__(self, id):
+        self.id = id
+
+    def getMarkdown(self):
+        return [ "# {}\n".format( self.id ) ]
+
+class FakeServer:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.requests = []
+
+    def convert(self, params):
+        self.requests.append( params )
+        if self.error is not None:
+            raise self.error
+        return "<p>{}</p>".format( self.name ), [ "converted by {}".format( self.name ) ]
+
+class FakeRunner:
+    def __init__(self):
+        self.jobs = []
+
+    def run(self, jobs):
+        self.jobs.extend( jobs )
+        return [ PandocResult( job, 0, "fallback" ) for job in jobs ]
+
+class TestPandocServerRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def makeJobs(self, count):
+        jobs = []
+        for i in range(count):
+            outpath = os.path.join( self.tmpdir, "page{}.html".format( i ) )
+            jobs.append( PandocJob( TestPage( "page{}".format( i ) ), [], outpath, options={ "to": "html5" } ) )
+        return jobs
+
+    def readFile(self, fn):
+        with open( fn ) as f:
+            return f.read()
+
+    def test_jobsAreSentRoundRobin(self):
+        servers = [ FakeServer( "a" ), FakeServer( "b" ) ]
+        fallback = FakeRunner()
+        jobs = self.makeJobs( 4 )
+        results = PandocServerRunner( servers, fallback ).run( jobs )
+
+        self.assertEqual( [ r.returncode for r in results ], [ 0, 0, 0, 0 ] )
+        self.assertEqual( [ r.stderr for r in results ],
+                [ "converted by a", "converted by b", "converted by a", "converted by b" ] )
+        self.assertEqual( len(servers[0].requests), 2 )
+        self.assertEqual( len(servers[1].requests), 2 )
+        self.assertEqual( self.readFile( jobs[1].outpath ), "<p>b</p>" )
+        self.assertEqual( fallback.jobs, [] )
+
+    def test_requestParameters(self):
+        server = FakeServer( "a" )
+        job = self.makeJobs( 1 )[0]
+        job.sourcefile = "/export/page0.markdown"
+        job.metadata = '{"sx": {"title": "a"}}'
+        PandocServerRunner( [ server ], FakeRunner() ).run( [ job ] )
+
+        params = server.requests[0]
+        self.assertEqual( params["to"], "html5" )
+        self.assertEqual( params["variables"], { "sourcefile": "/export/page0.markdown" } )
+        self.assertEqual( params["text"], '---\n{"sx": {"title": "a"}}\n---\n\n# page0\n' )
+
+    def test_failedRequestsFallBack(self):
+        for error in [ URLError( "refused" ), socket.timeout( "timed out" ) ]:
+            server = FakeServer( "a", error )
+            fallback = FakeRunner()
+            jobs = self.makeJobs( 2 )
+            results = PandocServerRunner( [ server ], fallback ).run( jobs )
+
+            self.assertEqual( [ r.stderr for r in results ], [ "fallback", "fallback" ] )
+            self.assertEqual( fallback.jobs, jobs )
+            self.assertFalse( os.path.exists( jobs[0].outpath ) )
+
+    def test_serverThatCanNotStart(self):
+        command = pandocserver.pandocservercmd
+        pandocserver.pandocservercmd = os.path.join( self.tmpdir, "pandoc-server" )
+        try:
+            server = PandocServer( os.path.join( self.tmpdir, "pandoc" ) )
+            self.assertFalse( server.start() )
+            self.assertIsNone( server.proc )
+            servers = PandocServerRunner.startServers( os.path.join( self.tmpdir, "pandoc" ), 2 )
+            self.assertEqual( servers, [] )
+        finally:
+            pandocserver.pandocservercmd = command
+
+if __name__ == "__main__":
+    unittest.main()
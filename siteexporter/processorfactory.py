@@ -16,50 +16,119 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+class PageChanges(object):
+    """The changes of the pages collected by a processor.  The changes are
+       applied to the pages in the merge phase."""
+
+    def __init__( self ):
+        self.attrs = [] # (page, attrDict) in the order they were added
+        self.newPages = []
+
+    def addExtraAttrs( self, page, attrDict ):
+        self.attrs.append( (page, attrDict) )
+
+    def addPage( self, page ):
+        self.newPages.append( page )
+
+    def apply( self, newPages ):
+        for page, attrDict in self.attrs:
+            page.addExtraAttrs( attrDict )
+        newPages.extend( self.newPages )
+
+
 # Instances of derived classes will be created by the ProcessorFactory.
+#
+# A processor is run in two phases.  In the collect phase the processors of
+# different pages run in parallel.  They must not modify the pages and return
+# the changes in a PageChanges object, instead.  In the merge phase the
+# changes are applied in the order of the pages.  A processor that returns
+# None from collect() is digested serially in the merge phase.
 class Processor(object):
-    pass
+    def collect( self, page, pages ):
+        return None
+
+    def merge( self, page, changes, newPages ):
+        changes.apply( newPages )
+
+    def digest( self, page, pages, newPages ):
+        changes = self.collect( page, pages )
+        if changes is not None:
+            self.merge( page, changes, newPages )
+
+
+# All the subclasses of @p klass, including the subclasses of subclasses.
+def _allSubclasses( klass ):
+    result = []
+    for sub in klass.__subclasses__():
+        result.append( sub )
+        result.extend( _allSubclasses( sub ) )
+    return result
 
 
 # Instances of derived classes will be created and called to register the
-# processors for the (default) supported page types.
+# processors for the (default) supported page types.  Every module that
+# defines a subclass can register its own page types.
 class ProcessorRegistry(object):
     @staticmethod
     def registerPageTypes( pageTypeProcFactory ):
-        for p in ProcessorRegistry.__subclasses__():
-            return p.__call__().registerPageTypes( pageTypeProcFactory )
+        for p in _allSubclasses( ProcessorRegistry ):
+            p.__call__().registerPageTypes( pageTypeProcFactory )
 
 
 class ProcessorFactory:
+    # Processor class name -> class
+    classes = {}
+
+    @staticmethod
+    def getProcessorClass( klassName ):
+        # The map is rebuilt when a processor is not found because the
+        # processor may be defined in a module that was imported later.
+        if not klassName in ProcessorFactory.classes:
+            ProcessorFactory.classes = dict( [ (p.__name__, p) for p in _allSubclasses( Processor ) ] )
+
+        return ProcessorFactory.classes.get( klassName )
+
     @staticmethod
     def getProcessor( klassName ):
-        for p in Processor.__subclasses__():
-            if p.__name__ == klassName:
-                return p.__call__()
+        klass = ProcessorFactory.getProcessorClass( klassName )
+        if klass is not None:
+            return klass.__call__()
 
         return None
 
 
 class PageTypeProcessorFactory:
+    """Maps page types to processors.  A single instance of each processor is
+       created and shared by all the pages of an export."""
+
     def __init__(self):
         self.pageProcessor = {}
+        self.processors = {} # processor class name -> processor instance
+        self.typeProcessors = {} # page type -> processor instance or None
 
     def getProcessor( self, pageType ):
-        if pageType in self.pageProcessor:
-            return ProcessorFactory.getProcessor( self.pageProcessor[ pageType ] )
+        if not pageType in self.typeProcessors:
+            self.typeProcessors[pageType] = self._getProcessorInstance( self.getProcessorName( pageType ) )
 
-        return None
+        return self.typeProcessors[pageType]
 
 
-    def getProcessorName( self, pageType ):
-        if pageType in self.pageProcessor:
-            return self.pageProcessor[ pageType ]
+    def _getProcessorInstance( self, klassName ):
+        if klassName is None:
+            return None
+
+        if not klassName in self.processors:
+            self.processors[klassName] = ProcessorFactory.getProcessor( klassName )
+
+        return self.processors[klassName]
 
-        return None
+
+    def getProcessorName( self, pageType ):
+        return self.pageProcessor.get( pageType )
 
 
     # Registering processors by class name will allow us to define new types of pages in the
     # configuration pages or use different processors for known page types.
     def registerPageType( self, pageType, processorKlassName ):
         self.pageProcessor[pageType] = processorKlassName
-
+        self.typeProcessors.pop( pageType, None )
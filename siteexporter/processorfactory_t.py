@@ -0,0 +1,58 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+from processorfactory import Processor, ProcessorRegistry, PageTypeProcessorFactory
+
+class FirstTestProcessor( Processor ):
+    pass
+
+class SecondTestProcessor( Processor ):
+    pass
+
+class FirstTestRegister( ProcessorRegistry ):
+    def registerPageTypes( self, pageTypeProcFactory ):
+        pageTypeProcFactory.registerPageType( "test.first", FirstTestProcessor.__name__ )
+        pageTypeProcFactory.registerPageType( "test.alias", FirstTestProcessor.__name__ )
+
+class SecondTestRegister( ProcessorRegistry ):
+    def registerPageTypes( self, pageTypeProcFactory ):
+        pageTypeProcFactory.registerPageType( "test.second", SecondTestProcessor.__name__ )
+
+class TestPageTypeProcessorFactory(unittest.TestCase):
+    def test_allRegistriesAreUsed(self):
+        factory = PageTypeProcessorFactory()
+        ProcessorRegistry.registerPageTypes( factory )
+        self.assertEqual( factory.getProcessorName( "test.first" ), "FirstTestProcessor" )
+        self.assertEqual( factory.getProcessorName( "test.second" ), "SecondTestProcessor" )
+
+    def test_processorsAreShared(self):
+        factory = PageTypeProcessorFactory()
+        ProcessorRegistry.registerPageTypes( factory )
+        first = factory.getProcessor( "test.first" )
+        self.assertTrue( isinstance( first, FirstTestProcessor ) )
+        self.assertTrue( factory.getProcessor( "test.first" ) is first )
+        self.assertTrue( factory.getProcessor( "test.alias" ) is first )
+        self.assertTrue( PageTypeProcessorFactory().getProcessor( "test.first" ) is None )
+
+    def test_unknownPageType(self):
+        factory = PageTypeProcessorFactory()
+        self.assertTrue( factory.getProcessor( "test.unknown" ) is None )
+        factory.registerPageType( "test.unknown", SecondTestProcessor.__name__ )
+        self.assertTrue( isinstance( factory.getProcessor( "test.unknown" ), SecondTestProcessor ) )
+
+if __name__ == "__main__":
+    unittest.main()
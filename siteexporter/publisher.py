@@ -0,0 +1,155 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import filecmp
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.publisher')
+
+
+class DiffPublisher:
+    """Copy the generated site to pubdir and modify only the files that changed.
+
+    A file is copied when its size differs from the published file or when the
+    modification times differ and the contents of the files differ.  Copied
+    files keep the modification time of the source and unchanged files give
+    their modification time to the source, so that unchanged files can be
+    detected without comparing the contents in the next export.  Unchanged
+    files in pubdir are never modified.  Files
+    in pubdir that are not a part of the site are removed.
+
+    When @p stage is set, the site is first built in a sibling directory of
+    pubdir and then renamed to pubdir.  Unchanged files are hard-linked from the
+    current pubdir if possible.
+    """
+
+    def __init__( self, pubdir, stage=False ):
+        self.pubdir = os.path.normpath( pubdir )
+        self.stage = stage
+        self.copied = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    # @p files maps paths relative to pubdir to source filenames.
+    def publish( self, files ):
+        if self.stage:
+            self._publishStaged( files )
+        else:
+            self._publishInPlace( files )
+
+        logger.info( "Published to '{}': {} copied, {} skipped, {} deleted.".format(
+            self.pubdir, self.copied, self.skipped, self.deleted ) )
+
+    def _isUnchanged( self, src, dst ):
+        if not os.path.exists( dst ):
+            return False
+        if os.path.abspath( src ) == os.path.abspath( dst ):
+            return True
+
+        srcStat = os.stat( src )
+        dstStat = os.stat( dst )
+        if srcStat.st_size != dstStat.st_size:
+            return False
+        if int(srcStat.st_mtime) == int(dstStat.st_mtime):
+            return True
+        if not filecmp.cmp( src, dst, shallow=False ):
+            return False
+
+        # The published file is not touched.  The source gets the time of the
+        # published file so that the contents are not compared again.
+        shutil.copystat( dst, src )
+        return True
+
+    def _copy( self, src, dst ):
+        dstdir = os.path.dirname( dst )
+        if not os.path.exists( dstdir ):
+            os.makedirs( dstdir )
+        if os.path.exists( dst ):
+            os.remove( dst )
+        shutil.copyfile( src, dst )
+        shutil.copystat( src, dst )
+        self.copied += 1
+
+    def _listFiles( self, root ):
+        result = set()
+        if not os.path.exists( root ):
+            return result
+        for dirpath, dirs, files in os.walk( root ):
+            for fn in files:
+                result.add( os.path.relpath( os.path.join( dirpath, fn ), root ) )
+        return result
+
+    def _removeEmptyDirs( self, root ):
+        for dirpath, dirs, files in os.walk( root, topdown=False ):
+            if dirpath != root and len(os.listdir( dirpath )) == 0:
+                os.rmdir( dirpath )
+
+    def _publishInPlace( self, files ):
+        for rel in self._listFiles( self.pubdir ):
+            if not rel in files:
+                os.remove( os.path.join( self.pubdir, rel ) )
+                self.deleted += 1
+        self._removeEmptyDirs( self.pubdir )
+
+        for rel, src in files.items():
+            dst = os.path.join( self.pubdir, rel )
+            if self._isUnchanged( src, dst ):
+                self.skipped += 1
+            else:
+                self._copy( src, dst )
+
+    def _publishStaged( self, files ):
+        stagedir = self.pubdir + ".sx-stage"
+        olddir = self.pubdir + ".sx-old"
+        for d in ( stagedir, olddir ):
+            if os.path.exists( d ):
+                shutil.rmtree( d )
+
+        published = self._listFiles( self.pubdir )
+        self.deleted = len([ rel for rel in published if not rel in files ])
+
+        for rel, src in files.items():
+            dst = os.path.join( self.pubdir, rel )
+            staged = os.path.join( stagedir, rel )
+            if self._isUnchanged( src, dst ):
+                stageddir = os.path.dirname( staged )
+                if not os.path.exists( stageddir ):
+                    os.makedirs( stageddir )
+                try:
+                    os.link( dst, staged )
+                except (OSError, AttributeError):
+                    shutil.copy2( dst, staged )
+                self.skipped += 1
+            else:
+                self._copy( src, staged )
+
+        if not os.path.exists( stagedir ):
+            os.makedirs( stagedir )
+
+        # The swap is not atomic: pubdir does not exist between the renames.
+        # The previous site is restored if the staged site can not be moved.
+        if os.path.exists( self.pubdir ):
+            os.rename( self.pubdir, olddir )
+        try:
+            os.rename( stagedir, self.pubdir )
+        except OSError:
+            if os.path.exists( olddir ) and not os.path.exists( self.pubdir ):
+                os.rename( olddir, self.pubdir )
+            raise
+        if os.path.exists( olddir ):
+            shutil.rmtree( olddir )
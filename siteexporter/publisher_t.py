@@ -0,0 +1,124 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+import publisher as publishermodule
+from publisher import DiffPublisher
+
+class TestDiffPublisher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.srcdir = os.path.join( self.tmpdir, "src" )
+        self.pubdir = os.path.join( self.tmpdir, "public" )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writeFile(self, root, rel, text):
+        fn = os.path.join( root, rel )
+        if not os.path.exists( os.path.dirname( fn ) ):
+            os.makedirs( os.path.dirname( fn ) )
+        with open( fn, "w" ) as f:
+            f.write( text )
+        return fn
+
+    def readFile(self, root, rel):
+        with open( os.path.join( root, rel ) ) as f:
+            return f.read()
+
+    def createSite(self):
+        files = {}
+        for rel, text in [ ("index.html", "index"), ("news/a.html", "news a"), ("main.css", "css") ]:
+            files[rel] = self.writeFile( self.srcdir, rel, text )
+        return files
+
+    def test_publishNewSite(self):
+        publisher = DiffPublisher( self.pubdir )
+        publisher.publish( self.createSite() )
+        self.assertEqual( publisher.copied, 3 )
+        self.assertEqual( self.readFile( self.pubdir, "news/a.html" ), "news a" )
+
+    def test_copyOnlyChangedFiles(self):
+        # -- GIVEN
+        files = self.createSite()
+        DiffPublisher( self.pubdir ).publish( files )
+        self.writeFile( self.srcdir, "index.html", "new index" )
+        self.writeFile( self.pubdir, "stale.html", "stale" )
+
+        # -- WHEN
+        publisher = DiffPublisher( self.pubdir )
+        publisher.publish( files )
+
+        # -- THEN
+        self.assertEqual( (publisher.copied, publisher.skipped, publisher.deleted), (1, 2, 1) )
+        self.assertEqual( self.readFile( self.pubdir, "index.html" ), "new index" )
+        self.assertFalse( os.path.exists( os.path.join( self.pubdir, "stale.html" ) ) )
+
+    def test_skipFilesWithSameContent(self):
+        files = self.createSite()
+        DiffPublisher( self.pubdir ).publish( files )
+        os.utime( files["main.css"], (1000, 1000) )
+
+        published = os.path.join( self.pubdir, "main.css" )
+        mtime = os.stat( published ).st_mtime
+
+        publisher = DiffPublisher( self.pubdir )
+        publisher.publish( files )
+        self.assertEqual( publisher.copied, 0 )
+        self.assertEqual( os.stat( published ).st_mtime, mtime )
+        self.assertEqual( int( os.stat( files["main.css"] ).st_mtime ), int( mtime ) )
+
+    def test_publishStaged(self):
+        # -- GIVEN
+        files = self.createSite()
+        DiffPublisher( self.pubdir ).publish( files )
+        self.writeFile( self.pubdir, "stale.html", "stale" )
+        del files["news/a.html"]
+
+        # -- WHEN
+        publisher = DiffPublisher( self.pubdir, stage=True )
+        publisher.publish( files )
+
+        # -- THEN
+        self.assertEqual( (publisher.copied, publisher.skipped, publisher.deleted), (0, 2, 2) )
+        self.assertEqual( sorted( os.listdir( self.pubdir ) ), [ "index.html", "main.css" ] )
+        self.assertEqual( sorted( os.listdir( self.tmpdir ) ), [ "public", "src" ] )
+
+    def test_restoreSiteWhenStageFails(self):
+        # -- GIVEN
+        files = self.createSite()
+        DiffPublisher( self.pubdir ).publish( files )
+        rename = os.rename
+        def failingRename( src, dst ):
+            if src.endswith( ".sx-stage" ):
+                raise OSError( "rename failed" )
+            rename( src, dst )
+
+        # -- WHEN
+        publishermodule.os.rename = failingRename
+        try:
+            self.assertRaises( OSError, DiffPublisher( self.pubdir, stage=True ).publish, files )
+        finally:
+            publishermodule.os.rename = rename
+
+        # -- THEN
+        self.assertEqual( self.readFile( self.pubdir, "news/a.html" ), "news a" )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,10 +17,18 @@
 import os
 
 class ResourceFinder:
+    """Find the layout files for pages.  The layout directory is listed once
+       and the results are cached, so one finder should be shared by all the
+       pages of an export."""
+
     def __init__( self, config, exportPath ):
         self.config = config
         self.exportPath = exportPath
         self.layout = None
+        self.layoutFiles = None # The names of the files in the layout directory
+        self.layoutFilesLower = None # The lowercase names of the files
+        self.discovered = {} # (templateBasename, pageType, ext) -> filename
+        self.resources = {} # resource name -> filename
 
     def layoutPath( self ):
         if self.layout is None:
@@ -32,26 +40,47 @@ class ResourceFinder:
 
         return os.path.join( self.exportPath, *self.layout.split(":") )
 
+    # The layout directory is listed when it is first needed, after the
+    # layout page was exported.  A name that differs from a listed name only
+    # in case is checked on the file system, so it is found only where the
+    # file system is case-insensitive.
+    def _layoutFileExists( self, name ):
+        if self.layoutFiles is None:
+            base = self.layoutPath()
+            self.layoutFiles = set( os.listdir( base ) ) if os.path.isdir( base ) else set()
+            self.layoutFilesLower = set([ fn.lower() for fn in self.layoutFiles ])
+
+        if os.path.basename( name ) != name:
+            return os.path.exists( os.path.join( self.layoutPath(), name ) )
+        if name in self.layoutFiles:
+            return True
+        if name.lower() in self.layoutFilesLower:
+            return os.path.exists( os.path.join( self.layoutPath(), name ) )
+        return False
+
     # Layout file: template, css, ...
     def _discoverLayoutFile( self, page, ext ):
-        base = self.layoutPath()
+        key = ( page.templateBasename, page.getPageType(), ext )
+        if not key in self.discovered:
+            self.discovered[key] = self._findLayoutFile( page.templateBasename, page.getPageType(), ext )
+        return self.discovered[key]
+
+    def _findLayoutFile( self, templateBasename, pageType, ext ):
+        names = []
 
         # Layout file for a specific page
-        if page.templateBasename is not None:
-            fn = os.path.join( base, "{}.{}".format( page.templateBasename, ext ) )
-            if os.path.exists( fn ):
-                return fn
+        if templateBasename is not None:
+            names.append( "{}.{}".format( templateBasename, ext ) )
 
         # Layout file for a specific page type
-        pageType = page.getPageType()
-        fn = os.path.join( base, "@{}@.{}".format( pageType, ext ) )
-        if os.path.exists( fn ):
-            return fn
+        names.append( "@{}@.{}".format( pageType, ext ) )
 
         # Default layout file
-        fn = os.path.join( base, "default.{}".format( ext ) )
-        if os.path.exists( fn ):
-            return fn
+        names.append( "default.{}".format( ext ) )
+
+        for name in names:
+            if self._layoutFileExists( name ):
+                return os.path.join( self.layoutPath(), name )
 
         return None
 
@@ -60,7 +89,7 @@ class ResourceFinder:
         if page.template is None:
             page.template = self._discoverLayoutFile( page, "html5" )
             if page.template is None:
-                pate.template = "default.html5"
+                page.template = "default.html5"
         return page.template
 
 
@@ -68,7 +97,7 @@ class ResourceFinder:
         if page.style is None:
             page.style = self._discoverLayoutFile( page, "css" )
             if page.style is None:
-                pate.style = "default.css"
+                page.style = "default.css"
         return page.style
 
 
@@ -76,10 +105,7 @@ class ResourceFinder:
         if filename is None:
             return None
 
-        base = self.layoutPath()
-
-        fn = os.path.join( base, filename )
-        if os.path.exists( fn ):
-            return fn
-
-        return None
+        if not filename in self.resources:
+            exists = self._layoutFileExists( filename )
+            self.resources[filename] = os.path.join( self.layoutPath(), filename ) if exists else None
+        return self.resources[filename]
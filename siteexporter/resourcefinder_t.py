@@ -0,0 +1,75 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from resourcefinder import ResourceFinder
+from testsupport import TestConfig
+
+def layoutConfig():
+    return TestConfig( { "layout": "layout:web" } )
+
+class TestPage:
+    def __init__( self, pageType, templateBasename=None ):
+        self.pageType = pageType
+        self.templateBasename = templateBasename
+        self.template = None
+        self.style = None
+
+    def getPageType( self ):
+        return self.pageType
+
+class TestResourceFinder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.layout = os.path.join( self.tmpdir, "layout", "web" )
+        os.makedirs( self.layout )
+        for name in [ "default.html5", "@news@.html5", "special.html5", "logo.png" ]:
+            with open( os.path.join( self.layout, name ), "w" ) as f:
+                f.write( name )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def test_pageTemplate(self):
+        finder = ResourceFinder( layoutConfig(), self.tmpdir )
+        self.assertEqual( finder.getPageTemplate( TestPage( "news" ) ),
+                os.path.join( self.layout, "@news@.html5" ) )
+        self.assertEqual( finder.getPageTemplate( TestPage( "news", "special" ) ),
+                os.path.join( self.layout, "special.html5" ) )
+        self.assertEqual( finder.getPageTemplate( TestPage( "page" ) ),
+                os.path.join( self.layout, "default.html5" ) )
+        self.assertEqual( finder.getPageStyleFile( TestPage( "page" ) ), "default.css" )
+
+    def test_layoutIsListedOnce(self):
+        finder = ResourceFinder( layoutConfig(), self.tmpdir )
+        self.assertEqual( finder.getResourceFile( "logo.png" ), os.path.join( self.layout, "logo.png" ) )
+        self.assertEqual( finder.getResourceFile( "missing.png" ), None )
+
+        os.remove( os.path.join( self.layout, "@news@.html5" ) )
+        self.assertEqual( finder.getPageTemplate( TestPage( "news" ) ),
+                os.path.join( self.layout, "@news@.html5" ) )
+
+    def test_caseOfNameFollowsFileSystem(self):
+        finder = ResourceFinder( layoutConfig(), self.tmpdir )
+        caseInsensitive = os.path.exists( os.path.join( self.layout, "LOGO.PNG" ) )
+        expected = os.path.join( self.layout, "Logo.png" ) if caseInsensitive else None
+        self.assertEqual( finder.getResourceFile( "Logo.png" ), expected )
+
+if __name__ == "__main__":
+    unittest.main()
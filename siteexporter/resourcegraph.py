@@ -0,0 +1,119 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os, re
+import json
+
+from fileutil import writeFileAtomic
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.resourcegraph')
+
+rxHtmlLink = re.compile( r'''(?:src|href)="([^"]+)"''' )
+rxCssLink = re.compile( r'''url\s*\(\s*["']?([^'")]+)["']?\s*\)''' )
+
+
+class ResourceGraph:
+    """The graph of links from HTML and CSS files to the resources they use.
+
+    The links of a file are parsed only once per export.  They are stored with
+    the modification time and the size of the file and can be saved so that
+    unchanged files are not parsed again in the next export.  The resources
+    required by a CSS file, including the resources of the imported CSS files,
+    are discovered only once and shared by all the pages that use the file.
+    """
+
+    version = 1
+
+    def __init__( self, filename=None ):
+        self.filename = filename
+        self.links = {}
+        self.cssResources = {}
+
+    def load( self ):
+        if self.filename is None or not os.path.exists( self.filename ):
+            return
+        try:
+            with open( self.filename ) as f:
+                data = json.load( f )
+        except (IOError, ValueError) as e:
+            logger.warning( "Invalid resource cache '{}': {}".format( self.filename, e ) )
+            return
+        if data.get( "version" ) == ResourceGraph.version:
+            self.links = data.get( "links", {} )
+
+    def save( self ):
+        if self.filename is None:
+            return
+        # Remove the entries of files that do not exist any more.
+        links = dict([ (fn, entry) for fn, entry in self.links.items() if os.path.exists( fn ) ])
+        data = { "version": ResourceGraph.version, "links": links }
+        writeFileAtomic( self.filename, lambda f: json.dump( data, f ) )
+
+    # A file that does not exist, eg. a page that Pandoc failed to convert,
+    # has no links.
+    def getLinks( self, fn, rxLink ):
+        if not os.path.exists( fn ):
+            return []
+
+        st = os.stat( fn )
+        entry = self.links.get( fn )
+        if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size:
+            return entry[2]
+
+        with open( fn ) as f:
+            text = f.read()
+        links = sorted( set([ mo.group(1) for mo in rxLink.finditer( text ) ]) )
+        self.links[fn] = [ st.st_mtime, st.st_size, links ]
+        return links
+
+    # Find the resources used by the HTML file @p htmlFn.  The links are
+    # resolved relative to @p baseDir.  Return a set of absolute filenames.
+    def findHtmlResources( self, htmlFn, baseDir ):
+        resources = set()
+        for link in self.getLinks( htmlFn, rxHtmlLink ):
+            if link.endswith( ".html" ):
+                continue
+            ressrc = os.path.normpath( os.path.join( baseDir, link ) )
+            if not os.path.exists( ressrc ):
+                continue
+
+            resources.add( ressrc )
+            if link.endswith( ".css" ):
+                resources.update( self.findCssResources( ressrc ) )
+
+        return resources
+
+    # Find the resources used by the CSS file @p cssFn and the CSS files it
+    # imports.
+    def findCssResources( self, cssFn ):
+        if cssFn in self.cssResources:
+            return self.cssResources[cssFn]
+
+        # Mark the file as visited to break import cycles.
+        self.cssResources[cssFn] = set()
+        resources = set()
+        cssDir = os.path.dirname( cssFn )
+        for url in self.getLinks( cssFn, rxCssLink ):
+            ressrc = os.path.normpath( os.path.join( cssDir, url ) )
+            if not os.path.exists( ressrc ):
+                continue
+            resources.add( ressrc )
+            if url.endswith( ".css" ):
+                resources.update( self.findCssResources( ressrc ) )
+
+        self.cssResources[cssFn] = resources
+        return resources
@@ -0,0 +1,70 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from resourcegraph import ResourceGraph, rxHtmlLink
+
+class TestResourceGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writeFile(self, rel, text):
+        fn = os.path.join( self.tmpdir, rel )
+        if not os.path.exists( os.path.dirname( fn ) ):
+            os.makedirs( os.path.dirname( fn ) )
+        with open( fn, "w" ) as f:
+            f.write( text )
+        return fn
+
+    def test_findHtmlResources(self):
+        html = self.writeFile( "news/a.html",
+                '<link href="../main.css"><img src="img/a.png"><a href="b.html"><img src="none.png">' )
+        css = self.writeFile( "main.css", '@import url("extra.css"); body { background: url(bg.png) }' )
+        self.writeFile( "extra.css", 'h1 { background: url("main.css") }' )
+        self.writeFile( "bg.png", "png" )
+        self.writeFile( "news/img/a.png", "png" )
+
+        graph = ResourceGraph()
+        resources = graph.findHtmlResources( html, os.path.dirname( html ) )
+
+        expected = [ "bg.png", "extra.css", "main.css", "news/img/a.png" ]
+        self.assertEqual( sorted([ os.path.relpath( r, self.tmpdir ) for r in resources ]), expected )
+
+    def test_missingFileHasNoLinks(self):
+        graph = ResourceGraph()
+        missing = os.path.join( self.tmpdir, "missing.html" )
+        self.assertEqual( graph.findHtmlResources( missing, self.tmpdir ), set() )
+
+    def test_savedLinksAreReused(self):
+        html = self.writeFile( "a.html", '<img src="a.png">' )
+        cache = os.path.join( self.tmpdir, "resources.json" )
+        graph = ResourceGraph( cache )
+        self.assertEqual( graph.getLinks( html, rxHtmlLink ), [ "a.png" ] )
+        graph.save()
+
+        graph = ResourceGraph( cache )
+        graph.load()
+        graph.links[html][2] = [ "cached.png" ]
+        self.assertEqual( graph.getLinks( html, rxHtmlLink ), [ "cached.png" ] )
+
+if __name__ == "__main__":
+    unittest.main()
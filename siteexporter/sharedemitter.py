@@ -0,0 +1,45 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+class SharedValueEmitter:
+    """The base of the emitters that serialize the extra attributes of pages.
+
+    The values of the shared keys are usually the same objects on many pages
+    (eg. the translations for a language).  Such a value is serialized only
+    once and the text is spliced into the metadata of all the pages that use
+    it.  The derived classes serialize a shared value in _dumpShared().
+    """
+
+    def __init__( self, sharedKeys=( "tr", "res", "navindex" ) ):
+        self.sharedKeys = sharedKeys
+        self.texts = {} # (key, id(value)) -> (value, text)
+        self.hits = 0
+
+    def _dumpShared( self, key, value ):
+        raise NotImplementedError()
+
+    def _getSharedText( self, key, value ):
+        # The value is stored with the text so that its id is not reused.
+        cacheKey = ( key, id(value) )
+        if cacheKey in self.texts:
+            self.hits += 1
+            return self.texts[cacheKey][1]
+
+        text = self._dumpShared( key, value )
+        self.texts[cacheKey] = ( value, text )
+        return text
@@ -16,10 +16,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os
 import datetime
-import dateutil.parser as dateparser
 
-from pageattributes import loadYamlAttributes
-from resourcefinder import ResourceFinder
+from pageattributes import loadYamlAttributes, parseCreationDate
+from manifest import hashAttributes
+from textutil import hashText
 
 import logging
 logger = logging.getLogger('zim.plugins.siteexporter.sxpage')
@@ -27,9 +27,13 @@ logger = logging.getLogger('zim.plugins.siteexporter.sxpage')
 mkdExtension = "markdown"
 htmlExtension = "html"
 
+# Marks the derived values that were not resolved yet
+_unresolved = object()
+
 class MarkdownPage:
-    def __init__( self, zimPage, exportData ):
-        """@p filename is relative to exportPath."""
+    def __init__( self, zimPage, exportData, attrs=None ):
+        """@p filename is relative to exportPath.  When @p attrs is None, the
+           attributes are read from the Zim page."""
         self.zimPage = zimPage
         self.exportData = exportData
         self.path = zimPage.parts # a list of parts that compose the path
@@ -44,6 +48,7 @@ class MarkdownPage:
         self.weight = 999999
         self.title = self.zimPage.get_title()
         self.lang = None
+        self._language = _unresolved # The language inherited from ancestors
         self.metaTitle = self.title
         self.menuText = None
         self._pageType = None
@@ -54,12 +59,38 @@ class MarkdownPage:
         self.expireDate = None
         self.publishDate = None
         self.unpublishDate = None
+        self.creationOrdinal = 1
+        self.publishOrdinal = 1
+        self._published = None # The cached state of isPublished() at exportData.now
         self.template = None
         self.templateBasename = None # template attribute
         self.style = None
         self.extraAttrs = {}
 
-        self.setAttributes( loadYamlAttributes( zimPage ) )
+        # The intermediate markdown text is loaded once and modified in memory
+        self.mkdLines = None
+        self.mkdModified = False
+        self.excerptLines = None # The excerpt before the links are adjusted
+
+        # The state of the page in an incremental export
+        self.sourceHash = None
+        self.outputHash = None
+        self.reexported = True
+        self.upToDate = False
+        # The JSON metadata file that is passed to Pandoc and its content
+        self.metadataFile = None
+        self.metadataText = None
+
+        # The creation date from the Zim page header
+        self.zimCreateDate = None
+
+        if attrs is None:
+            attrCache = exportData.attrCache if exportData is not None else None
+            if attrCache is not None:
+                attrs, self.zimCreateDate = attrCache.loadAttributes( zimPage )
+            else:
+                attrs = loadYamlAttributes( zimPage )
+        self.setAttributes( attrs )
 
 
     def fullFilename(self):
@@ -87,20 +118,33 @@ class MarkdownPage:
             return []
         return [ self.parentId(i) for i in range(1, len(self.path)) ]
 
+    # Iterate over the descendants in pre-order.
+    def iterDescendants( self ):
+        stack = list( reversed( self.children ) )
+        while len(stack) > 0:
+            page = stack.pop()
+            yield page
+            stack.extend( reversed( page.children ) )
+
     def getDescendants( self ):
-        return sum([ [c] + c.getDescendants() for c in self.children ], [])
+        return list( self.iterDescendants() )
+
+    # Iterate over the ancestors from the parent to the root.
+    def iterAncestors( self ):
+        page = self.parent
+        while page is not None:
+            yield page
+            page = page.parent
 
     def getAncestors( self ):
-        if self.parent is None:
-            return []
-        return [self.parent] + self.parent.getAncestors()
+        return list( self.iterAncestors() )
 
     def getPageLanguage( self ):
-        if self.lang is not None:
-            return self.lang
-        if self.parent is not None:
-            return self.parent.getPageLanguage()
-        return None
+        if self._language is _unresolved:
+            self._language = self.lang
+            if self._language is None and self.parent is not None:
+                self._language = self.parent.getPageLanguage()
+        return self._language
 
     def setAttributes( self, attrs ):
         if type(attrs) != type({}):
@@ -152,6 +196,9 @@ class MarkdownPage:
         if "unpublishDate" in attrs:
             self.unpublishDate = attrs["unpublishDate"].toordinal()
 
+        self._resolveDates()
+        self.invalidatePublishState()
+
 
     def addExtraAttrs( self, attrDict ):
         for k,v in attrDict.items():
@@ -199,10 +246,16 @@ class MarkdownPage:
         lang = self.getPageLanguage()
         if lang is None:
             lang = trans.getDefaultLanguage()
-        tr = {}
-        for var,default in translatedVars.items():
-            tr[var] = trans.getTranslation( lang, var, default )
-        self.extraAttrs["tr"] = tr
+
+        # The pages with the same language and template variables share the
+        # translations.
+        key = ( "tr", lang, frozenset( translatedVars.keys() ) )
+        if not key in exportData.sharedAttrs:
+            tr = {}
+            for var,default in translatedVars.items():
+                tr[var] = trans.getTranslation( lang, var, default )
+            exportData.sharedAttrs[key] = tr
+        self.extraAttrs["tr"] = exportData.sharedAttrs[key]
 
     def _completeResources( self, resourceVars ):
         # Find resources for template variables and write their relative paths
@@ -213,15 +266,24 @@ class MarkdownPage:
         def makeRelative( path ):
             return os.path.relpath( path, curDir )
 
-        resFinder = ResourceFinder( self.exportData.config, self.exportData.exportPath() )
-        res = {}
-        for var,default in resourceVars.items():
-            item = self.attrs[var] if var in self.attrs else default
-            resfile = resFinder.getResourceFile( item ) if item is not None else None
-            if resfile is not None:
-                res[var] = makeRelative( resfile )
+        items = [ (var, self.attrs[var] if var in self.attrs else default)
+                for var,default in resourceVars.items() ]
 
-        self.extraAttrs["res"] = res
+        # The pages in the same directory that use the same resources share
+        # the resource paths.  The attribute values may be lists or mappings
+        # so the key uses their hash.
+        key = ( "res", curDir, hashAttributes( dict( items ) ) )
+        sharedAttrs = self.exportData.sharedAttrs
+        if not key in sharedAttrs:
+            resFinder = self.exportData.resourceFinder
+            res = {}
+            for var,item in items:
+                resfile = resFinder.getResourceFile( item ) if item is not None else None
+                if resfile is not None:
+                    res[var] = makeRelative( resfile )
+            sharedAttrs[key] = res
+
+        self.extraAttrs["res"] = sharedAttrs[key]
 
 
     def getPageType( self ):
@@ -239,13 +301,25 @@ class MarkdownPage:
         return self._pageType
 
     def isPublished( self, dateTime=None  ):
+        if dateTime is not None:
+            return self._evalPublished( dateTime )
+
+        if self._published is None:
+            self._published = self._evalPublished( self.exportData.now )
+        return self._published
+
+    # Clear the cached publish state of the page and its descendants. Must be
+    # called when the attributes that affect the publish state are modified.
+    def invalidatePublishState( self ):
+        self._published = None
+        for c in self.children:
+            c.invalidatePublishState()
+
+    def _evalPublished( self, dateTime ):
         if not self.zimPage.exists() or not self.published or self.isDraft:
             return False
 
-        if dateTime is None:
-            dateTime = self.exportData.now
-
-        if dateTime.toordinal() < self.getPublishDate().toordinal():
+        if dateTime.toordinal() < self.publishOrdinal:
             return False
 
         if self.unpublishDate is not None and dateTime.toordinal() >= self.unpublishDate:
@@ -267,45 +341,176 @@ class MarkdownPage:
         return dateTime.toordinal() >= self.expireDate
 
 
-    def getCreationDate( self ):
+    # Resolve the creation and the publish date once so that the pages can be
+    # sorted by comparing ordinals.
+    def _resolveDates( self ):
         if self.createDate is not None:
-            return datetime.date.fromordinal(self.createDate)
+            self.creationOrdinal = self.createDate
+        elif self.zimCreateDate is not None:
+            self.creationOrdinal = self.zimCreateDate.toordinal()
+        elif self.zimPage._meta is not None and "Creation-Date" in self.zimPage._meta:
+            self.creationOrdinal = parseCreationDate( self.zimPage._meta["Creation-Date"] ).toordinal()
+        elif self.zimPage.ctime is not None:
+            self.creationOrdinal = self.zimPage.ctime.toordinal()
+        else:
+            self.creationOrdinal = 1
 
-        def makeDate( dt ):
-            if dt is None:
-                return datetime.date.fromordinal( 1 )
-            return datetime.date.fromordinal( dt.toordinal() )
+        if self.publishDate is not None:
+            self.publishOrdinal = self.publishDate
+        else:
+            self.publishOrdinal = self.creationOrdinal
 
-        if self.zimPage._meta is not None and "Creation-Date" in self.zimPage._meta:
-            return makeDate(dateparser.parse(self.zimPage._meta["Creation-Date"]))
 
-        return makeDate(self.zimPage.ctime)
+    def getCreationDate( self ):
+        return datetime.date.fromordinal( self.creationOrdinal )
 
 
     def getPublishDate( self ):
-        if self.publishDate is not None:
-            return datetime.date.fromordinal(self.publishDate)
-
-        return self.getCreationDate()
+        return datetime.date.fromordinal( self.publishOrdinal )
 
 
     def hasMenuEntry( self ):
         return self.menuText is not None and self.isPublished()
 
     def getMarkdown( self ):
-        """Get the current intermediate markdown text from the exported file."""
+        """Get the current intermediate markdown text.  The text is read from
+           the exported file the first time it is needed."""
+        if self.mkdLines is None:
+            with open( self.fullFilename() ) as f:
+                self.mkdLines = f.readlines()
+        return self.mkdLines
+
+    def iterMarkdown( self ):
+        """Iterate over the lines of the intermediate markdown text.  When the
+           text is not loaded yet, the lines are streamed from the file."""
+        if self.mkdLines is not None:
+            for line in self.mkdLines:
+                yield line
+            return
         with open( self.fullFilename() ) as f:
-            return f.readlines()
-        return None
+            for line in f:
+                yield line
 
+    def setMarkdown( self, mkdLines ):
+        self.mkdLines = mkdLines
+        self.mkdModified = True
+        self.excerptLines = None
 
-# copy the parent realtions from Page to MarkdownPage
-def findPageParents( mkdFiles ):
-    for f in mkdFiles:
-        if f.zimPage.parent is None or f.zimPage.parent == f.zimPage:
-            continue
-        for pf in mkdFiles:
-            if pf.zimPage == f.zimPage.parent:
+    def writeMarkdown( self ):
+        """Write the modified intermediate markdown text to the exported file."""
+        if not self.mkdModified:
+            return
+        dirname = os.path.dirname( self.fullFilename() )
+        if not os.path.exists( dirname ):
+            os.makedirs( dirname )
+        with open( self.fullFilename(), "w" ) as fout:
+            fout.write( "".join( self.mkdLines ) )
+        self.mkdModified = False
+
+
+class GeneratedZimPage:
+    """Stands in for the Zim page of a page that is generated by the exporter."""
+
+    def __init__( self, path, title ):
+        self.parts = path
+        self.name = ":".join( path )
+        self.parent = None
+        self.ctime = None
+        self._meta = None
+        self.title = title
+
+    def get_title( self ):
+        return self.title
+
+    def exists( self ):
+        return True
+
+
+class GeneratedPage( MarkdownPage ):
+    """A page that is created by a page processor and does not exist in the
+       notebook.  The page is added to the children of @p parent when it is
+       added to the registry.  Its markdown text is written to the export
+       directory in every export."""
+
+    def __init__( self, path, parent, title, attrs, exportData ):
+        zimPage = GeneratedZimPage( path, title )
+        MarkdownPage.__init__( self, zimPage, exportData, attrs )
+        self.parent = parent
+        self.reexported = False
+        if self._pageType is None:
+            self._pageType = "page"
+
+    # The generated text is the source of the page.
+    def setContent( self, mkdLines ):
+        self.setMarkdown( mkdLines )
+        self.sourceHash = hashText( "".join( mkdLines ) )
+
+
+class PageRegistry:
+    """The exported pages indexed by their ids."""
+
+    def __init__( self, mkdFiles=() ):
+        self.pages = []
+        self.pagesById = {}
+        for page in mkdFiles:
+            self.add( page )
+
+    def __iter__( self ):
+        return iter( self.pages )
+
+    def __len__( self ):
+        return len( self.pages )
+
+    def add( self, page ):
+        self.pages.append( page )
+        self.pagesById[page.id] = page
+
+    def addGenerated( self, page ):
+        self.add( page )
+        if page.parent is not None:
+            page.parent.children.append( page )
+
+    def getPage( self, pageId ):
+        return self.pagesById.get( pageId )
+
+    # Evaluate the publish state of all pages, parents before children.
+    def evaluatePublishState( self ):
+        for page in sorted( self.pages, key=lambda p: p.level ):
+            page.isPublished()
+
+    # Clear the cached publish state of all pages. Must be called when the
+    # time of the export changes.
+    def invalidatePublishState( self ):
+        for page in self.pages:
+            if page.parent is None:
+                page.invalidatePublishState()
+
+    # Resolve the language and the page type that pages inherit from their
+    # ancestors in a single walk over the page tree.
+    def resolveDerivedValues( self ):
+        stack = [ (page, None, None) for page in self.pages if page.parent is None ]
+        while len(stack) > 0:
+            page, lang, childType = stack.pop()
+            page._language = page.lang if page.lang is not None else lang
+            if page._pageType is None:
+                page._pageType = childType if childType is not None else "page"
+            if page._childType is not None:
+                childType = page._childType
+            stack.extend( [ (c, page._language, childType) for c in page.children ] )
+
+    # copy the parent realtions from Page to MarkdownPage
+    def linkParents( self ):
+        for f in self.pages:
+            if f.zimPage.parent is None or f.zimPage.parent == f.zimPage:
+                continue
+            pf = self.pagesById.get( f.parentId() )
+            if pf is not None:
                 f.parent = pf
                 pf.children.append( f )
-                break
+
+
+# copy the parent realtions from Page to MarkdownPage
+def findPageParents( mkdFiles ):
+    registry = PageRegistry( mkdFiles )
+    registry.linkParents()
+    return registry
@@ -0,0 +1,69 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import datetime
+import unittest
+from sxpage import MarkdownPage, findPageParents
+from testsupport import TestExportData
+
+class TestZimPage:
+    def __init__( self, parts, parent=None ):
+        self.parts = parts
+        self.parent = parent
+        self._meta = { "Creation-Date": "2018-10-11T12:13:14+02:00" }
+
+    def get_title( self ):
+        return self.parts[-1]
+
+    def exists( self ):
+        return True
+
+
+class TestPublishState(unittest.TestCase):
+    def makePages( self ):
+        self.exportData = TestExportData()
+        zimParent = TestZimPage( ["news"] )
+        zimChild = TestZimPage( ["news", "item"], zimParent )
+        self.parent = MarkdownPage( zimParent, self.exportData, {} )
+        self.child = MarkdownPage( zimChild, self.exportData, {} )
+        self.registry = findPageParents( [ self.parent, self.child ] )
+        self.registry.evaluatePublishState()
+
+    def test_setAttributesRecomputesState(self):
+        self.makePages()
+        self.assertTrue( self.child.isPublished() )
+
+        self.parent.setAttributes( { "draft": True } )
+
+        self.assertFalse( self.parent.isPublished() )
+        self.assertFalse( self.child.isPublished() )
+
+    def test_registryRecomputesState(self):
+        self.makePages()
+        tomorrow = self.exportData.now + datetime.timedelta( days=1 )
+        self.parent.setAttributes( { "publishDate": tomorrow } )
+        self.assertFalse( self.child.isPublished() )
+
+        self.exportData.now = tomorrow
+        self.assertFalse( self.child.isPublished() )
+        self.registry.invalidatePublishState()
+
+        self.assertTrue( self.parent.isPublished() )
+        self.assertTrue( self.child.isPublished() )
+
+
+if __name__ == "__main__":
+    unittest.main()
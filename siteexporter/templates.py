@@ -15,27 +15,134 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os, re
+import json
+
+from textutil import hashText
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.templates')
+
+# Change when the compiled templates change for the same sources.
+compilerVersion = "1"
 
 class TemplateProcessor:
-    def __init__(self):
+    def __init__(self, cacheDir=None):
         # Variables that need translations in Pandoc templates
         self.translatedVars = {}
 
         # Variables that need need path resolution in Pandoc templates
         self.resourceVars = {}
 
+        # Rendered chunks that replace the included chunks with the same name
+        self.sharedChunks = {}
+
+        # The compiled templates are stored in cacheDir.  When it is None, the
+        # templates are rewritten in place.
+        self.cacheDir = cacheDir
+        self.compiledTemplates = {} # template -> compiled template
+        self.templateVariables = {} # compiled template -> variables
+
+    # Compile the template and return the name of the compiled template.  The
+    # name of a compiled template is the hash of the template with all the
+    # included chunks so an unchanged template is compiled only once.
     def processTemplate( self, templateFilename ):
         if not os.path.exists( templateFilename ):
-            return
+            return None
         with open( templateFilename ) as f:
             lines = f.readlines()
 
-        lines = self.includeTemplateChunks( lines, os.path.dirname( templateFilename ) )
-        lines = self.prepareTranslatedVariables( lines )
-        lines = self.prepareResourceVariables( lines )
-
-        with open( templateFilename, "w" ) as f:
+        lines = self.includeTemplateChunks( lines, os.path.dirname( templateFilename ),
+                ( os.path.abspath( templateFilename ), ) )
+
+        if self.cacheDir is None:
+            compiledFn = templateFilename
+            variables = None
+        else:
+            key = hashText( compilerVersion, "".join( lines ) )
+            compiledFn = os.path.join( self.cacheDir,
+                    key + os.path.splitext( templateFilename )[1] )
+            variables = self._loadVariables( compiledFn )
+
+        if variables is None:
+            variables = { "translated": {}, "resources": {} }
+            lines = self.prepareTranslatedVariables( lines, variables["translated"] )
+            lines = self.prepareResourceVariables( lines, variables["resources"] )
+            self._addIncludedVariables( lines, variables )
+            self._saveCompiledTemplate( compiledFn, lines, variables )
+        else:
+            logger.debug( "Template '{}' is compiled.".format( templateFilename ) )
+            for var,default in variables["translated"].items():
+                self.addTranslatedVariable( var, default )
+            for var,default in variables["resources"].items():
+                self.addResourceVariable( var, default )
+
+        self.compiledTemplates[templateFilename] = compiledFn
+        self.templateVariables[compiledFn] = variables
+        return compiledFn
+
+
+    def getCompiledTemplate( self, templateFilename ):
+        return self.compiledTemplates.get( templateFilename, templateFilename )
+
+
+    # The variables used by a compiled template.  The variables of all the
+    # templates are returned for a template that was not processed.
+    def getTemplateVariables( self, compiledFn ):
+        if not compiledFn in self.templateVariables:
+            return { "translated": self.translatedVars, "resources": self.resourceVars }
+        return self.templateVariables[compiledFn]
+
+
+    # The shared chunks are included with the variables already replaced so
+    # their variables are found in the compiled text.
+    def _addIncludedVariables( self, lines, variables ):
+        rxvar = re.compile( r"\$sx\.(tr|res)\.([-_a-zA-Z0-9]+)\$" )
+        for line in lines:
+            for kind, var in rxvar.findall( line ):
+                if kind == "tr" and var in self.translatedVars:
+                    variables["translated"].setdefault( var, self.translatedVars[var] )
+                elif kind == "res" and var in self.resourceVars:
+                    variables["resources"].setdefault( var, self.resourceVars[var] )
+
+
+    def _variablesFilename( self, compiledFn ):
+        return os.path.splitext( compiledFn )[0] + ".json"
+
+
+    # The variables are saved after the template so a template is compiled
+    # only when its variables exist.
+    def _loadVariables( self, compiledFn ):
+        varsFn = self._variablesFilename( compiledFn )
+        if not os.path.exists( compiledFn ) or not os.path.exists( varsFn ):
+            return None
+        try:
+            with open( varsFn ) as f:
+                return json.load( f )
+        except ValueError:
+            return None
+
+
+    def _saveCompiledTemplate( self, compiledFn, lines, variables ):
+        if self.cacheDir is not None and not os.path.exists( self.cacheDir ):
+            os.makedirs( self.cacheDir )
+        with open( compiledFn, "w" ) as f:
             f.write( "".join( lines ) )
+        if self.cacheDir is not None:
+            with open( self._variablesFilename( compiledFn ), "w" ) as f:
+                json.dump( variables, f )
+
+
+    # Remove the compiled templates that were not used in this export.
+    def removeUnusedTemplates( self ):
+        if self.cacheDir is None or not os.path.isdir( self.cacheDir ):
+            return
+        used = set()
+        for compiledFn in self.templateVariables.keys():
+            used.add( os.path.basename( compiledFn ) )
+            used.add( os.path.basename( self._variablesFilename( compiledFn ) ) )
+        for fn in os.listdir( self.cacheDir ):
+            if not fn in used:
+                os.remove( os.path.join( self.cacheDir, fn ) )
 
 
     def addTranslatedVariable( self, var, default ):
@@ -48,7 +155,34 @@ class TemplateProcessor:
             self.resourceVars[var] = default
 
 
-    def includeTemplateChunks( self, lines, baseDir ):
+    # Preprocess a template chunk that will be rendered once for all pages.
+    # The placeholders for translations and resources are replaced with
+    # markers so that they are resolved in each page when the rendered chunk
+    # is included.
+    def prepareSharedChunk( self, chunkFilename ):
+        with open( chunkFilename ) as f:
+            lines = f.readlines()
+
+        lines = self.prepareTranslatedVariables( lines )
+        lines = self.prepareResourceVariables( lines )
+        rxplaceholder = re.compile( r"\$(sx\.(?:tr|res)\.[-_a-zA-Z0-9]+)\$" )
+        return [ rxplaceholder.sub( r"[[sxvar:\1]]", line ) for line in lines ]
+
+
+    # Register a rendered chunk.  The markers created by prepareSharedChunk
+    # and the strings in @p placeholders are replaced with template variables.
+    def addSharedChunk( self, name, text, placeholders={} ):
+        text = text.replace( "$", "$$" )
+        text = re.sub( r"\[\[sxvar:([^\]]+)\]\]", r"$\1$", text )
+        for placeholder, var in placeholders.items():
+            text = text.replace( placeholder, "${}$".format( var ) )
+        self.sharedChunks[name] = text
+
+
+    # Replace the include directives with the content of the chunks.  The
+    # chunks may include other chunks.  @p including are the absolute names of
+    # the files that are being included, used to detect cycles.
+    def includeTemplateChunks( self, lines, baseDir, including=() ):
         rxinclude = re.compile( r"^\s*\[@\s*include\s+([^@\]]+)@\]\s*$" )
         res = []
 
@@ -56,38 +190,52 @@ class TemplateProcessor:
             mo = rxinclude.match( line )
             if mo is None:
                 res.append( line )
+            elif mo.group(1).strip() in self.sharedChunks:
+                res.extend( self.sharedChunks[mo.group(1).strip()].splitlines( True ) )
             else:
                 fn = os.path.join( baseDir, mo.group(1).strip() )
                 if not os.path.exists( fn ):
                     res.append( line )
                     res.append( "FAILED: no {}\n".format( fn ) )
+                elif os.path.abspath( fn ) in including:
+                    logger.warning( "Template chunk '{}' includes itself.".format( fn ) )
+                    res.append( line )
+                    res.append( "FAILED: recursive include of {}\n".format( fn ) )
                 else:
                     with open( fn ) as f:
-                        res.extend( f.readlines() )
+                        chunk = f.readlines()
+                    res.extend( self.includeTemplateChunks( chunk, os.path.dirname( fn ),
+                        including + ( os.path.abspath( fn ), ) ) )
         return res
 
 
     # Rewrite [@ tr var default @] --> $sx.tr.var$ and register the variables in translatedVars.
-    def prepareTranslatedVariables( self, lines ):
+    # The variables are also added to @p variables if it is not None.
+    def prepareTranslatedVariables( self, lines, variables=None ):
         rxtranslate = re.compile( r"\[@\s*tr\s+([-_a-zA-Z0-9]+)(\s+[^@\]]+)\s*@\]" )
 
         def markTranslation( mo ):
             var = mo.group(1)
             default = mo.group(2).strip()
             self.addTranslatedVariable( var, default )
+            if variables is not None and not var in variables:
+                variables[var] = default
             return  "$sx.tr.{}$".format( var )
 
         return [ rxtranslate.sub( markTranslation, line ) for line in lines ]
 
 
     # Rewrite [@ res var default @] --> $sx.res.var$ and register the variables in resourceVars.
-    def prepareResourceVariables( self, lines ):
+    # The variables are also added to @p variables if it is not None.
+    def prepareResourceVariables( self, lines, variables=None ):
         rxres = re.compile( r"\[@\s*res\s+([-_a-zA-Z0-9]+)(\s+[^@\]]+)?\s*@\]" )
 
         def markResource( mo ):
             var = mo.group(1)
             default = mo.group(2).strip() if mo.group(2) is not None else None
             self.addResourceVariable( var, default )
+            if variables is not None and not var in variables:
+                variables[var] = default
             return  "$sx.res.{}$".format( var )
 
         return [ rxres.sub( markResource, line ) for line in lines ]
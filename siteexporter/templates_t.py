@@ -0,0 +1,111 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import unittest
+from templates import TemplateProcessor
+
+class TestTemplateProcessor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.layout = os.path.join( self.tmpdir, "layout" )
+        self.cacheDir = os.path.join( self.tmpdir, "cache" )
+        os.makedirs( self.layout )
+
+    def tearDown(self):
+        shutil.rmtree( self.tmpdir )
+
+    def writeFile(self, name, text):
+        fn = os.path.join( self.layout, name )
+        with open( fn, "w" ) as f:
+            f.write( text )
+        return fn
+
+    def readFile(self, fn):
+        with open( fn ) as f:
+            return f.read()
+
+    def test_nestedIncludes(self):
+        template = self.writeFile( "page.html5", "<html>\n[@include head.htmli@]\n</html>\n" )
+        self.writeFile( "head.htmli", "<head>\n[@include title.htmli@]\n</head>\n" )
+        self.writeFile( "title.htmli", "<title>[@tr site Site @]</title>\n" )
+
+        proc = TemplateProcessor( self.cacheDir )
+        compiled = proc.processTemplate( template )
+
+        self.assertEqual( self.readFile( compiled ),
+                "<html>\n<head>\n<title>$sx.tr.site$</title>\n</head>\n</html>\n" )
+        self.assertEqual( proc.translatedVars, { "site": "Site" } )
+        self.assertEqual( proc.getCompiledTemplate( template ), compiled )
+        self.assertTrue( "[@include" in self.readFile( template ) )
+
+    def test_recursiveInclude(self):
+        template = self.writeFile( "page.html5", "[@include a.htmli@]\n" )
+        self.writeFile( "a.htmli", "a\n[@include b.htmli@]\n" )
+        self.writeFile( "b.htmli", "b\n[@include a.htmli@]\n" )
+
+        compiled = TemplateProcessor( self.cacheDir ).processTemplate( template )
+
+        self.assertTrue( "FAILED: recursive include" in self.readFile( compiled ) )
+
+    def test_compiledTemplateIsReused(self):
+        template = self.writeFile( "page.html5", "[@res logo logo.png @] [@tr home Home @]\n" )
+        compiled = TemplateProcessor( self.cacheDir ).processTemplate( template )
+        with open( compiled, "a" ) as f:
+            f.write( "cached\n" )
+
+        proc = TemplateProcessor( self.cacheDir )
+        self.assertEqual( proc.processTemplate( template ), compiled )
+        self.assertTrue( "cached" in self.readFile( compiled ) )
+        self.assertEqual( proc.resourceVars, { "logo": "logo.png" } )
+        self.assertEqual( proc.translatedVars, { "home": "Home" } )
+
+        self.writeFile( "page.html5", "[@tr home Home @]\n" )
+        proc = TemplateProcessor( self.cacheDir )
+        changed = proc.processTemplate( template )
+        proc.removeUnusedTemplates()
+        self.assertNotEqual( changed, compiled )
+        self.assertFalse( os.path.exists( compiled ) )
+
+    def test_variablesPerTemplate(self):
+        news = self.writeFile( "news.html5", "[@tr readmore More @]\n[@include nav.htmli@]\n" )
+        page = self.writeFile( "page.html5", "[@res logo logo.png @]\n[@include nav.htmli@]\n" )
+        self.writeFile( "nav.htmli", "[@tr home Home @]\n" )
+
+        proc = TemplateProcessor( self.cacheDir )
+        newsVars = proc.getTemplateVariables( proc.processTemplate( news ) )
+        pageVars = proc.getTemplateVariables( proc.processTemplate( page ) )
+
+        self.assertEqual( newsVars["translated"], { "readmore": "More", "home": "Home" } )
+        self.assertEqual( newsVars["resources"], {} )
+        self.assertEqual( pageVars["translated"], { "home": "Home" } )
+        self.assertEqual( pageVars["resources"], { "logo": "logo.png" } )
+
+    def test_sharedChunkVariables(self):
+        template = self.writeFile( "page.html5", "[@include nav.htmli@]\n" )
+        chunk = self.writeFile( "nav.htmli", "<nav>[@tr home Home @]</nav>\n" )
+
+        proc = TemplateProcessor( self.cacheDir )
+        rendered = "".join( proc.prepareSharedChunk( chunk ) )
+        proc.addSharedChunk( "nav.htmli", rendered )
+        variables = proc.getTemplateVariables( proc.processTemplate( template ) )
+
+        self.assertEqual( variables["translated"], { "home": "Home" } )
+
+if __name__ == "__main__":
+    unittest.main()
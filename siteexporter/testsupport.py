@@ -0,0 +1,66 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# The fixtures shared by the unit tests.
+import datetime
+
+from processorfactory import PageTypeProcessorFactory, ProcessorRegistry
+from resourcefinder import ResourceFinder
+
+
+class TestConfig:
+    """A configuration with the values from a dictionary."""
+
+    name = "config"
+
+    def __init__( self, values=None ):
+        self.values = values if values is not None else {}
+
+    def getValue( self, name, default=None ):
+        return self.values.get( name, default )
+
+
+class TestNotebookLayout:
+    def __init__( self, root ):
+        self.root = root
+
+
+class TestNotebook:
+    def __init__( self, root ):
+        self.name = "test"
+        self.dir = root
+        self.layout = TestNotebookLayout( root )
+        self.pages = []
+
+
+class TestExportData:
+    """Stands in for ExporterData in the tests that do not need Zim."""
+
+    def __init__( self, config=None, exportPath="/tmp/sx-test" ):
+        self.config = config if config is not None else TestConfig()
+        self._exportPath = exportPath
+        self.notebook = TestNotebook( exportPath )
+        self.attrCache = None
+        self.trans = None
+        self.resourceFinder = ResourceFinder( self.config, exportPath )
+        self.now = datetime.datetime.now()
+        self.sharedAttrs = {}
+        self.pageTypeProcFactory = PageTypeProcessorFactory()
+        ProcessorRegistry.registerPageTypes( self.pageTypeProcFactory )
+
+    def exportPath( self ):
+        return self._exportPath
@@ -0,0 +1,33 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import hashlib
+
+
+def toBytes( text ):
+    if isinstance( text, type(u"") ):
+        return text.encode( "utf-8" )
+    return text
+
+
+# The SHA1 hash of the text parts.  The parts are separated so that the
+# parts "a", "bc" and "ab", "c" have different hashes.
+def hashText( *parts ):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update( toBytes( part if part is not None else "" ) )
+        h.update( b"\0" )
+    return h.hexdigest()
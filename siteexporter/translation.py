@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from zim.notebook.page import Path
-from pageattributes import loadYamlAttributes
+from attrcache import loadCachedAttributes
 import locale
 
 import logging
@@ -25,8 +25,9 @@ class Translations:
     """Read translations from YAML attributes of lang-xx pages stored
        in the current configuration and layout trees."""
 
-    def __init__( self, config ):
+    def __init__( self, config, attrCache=None ):
         self.config = config
+        self.attrCache = attrCache
         self.translations = {}
 
 
@@ -67,7 +68,7 @@ class Translations:
         langPageId = "{}:lang-{}".format( page.name, lang )
         zimLangPage = self.config.notebook.get_page( Path(langPageId) )
         if zimLangPage is not None and zimLangPage.exists():
-            attrs = loadYamlAttributes( zimLangPage )
+            attrs = loadCachedAttributes( zimLangPage, self.attrCache )
             for k,v in attrs.items():
                 tr[k] = v
             logger.debug( "Found page: {}".format( langPageId ) )
@@ -0,0 +1,84 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import multiprocessing
+
+import logging
+logger = logging.getLogger('zim.plugins.siteexporter.workerpool')
+
+
+def defaultJobCount():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+# Read the number of parallel jobs from the configuration value 'jobs'.
+def getJobCount( config ):
+    jobs = config.getValue( "jobs" ) if config is not None else None
+    if jobs is None:
+        return defaultJobCount()
+
+    try:
+        jobs = int(jobs)
+    except (TypeError, ValueError):
+        logger.warning( "Invalid value for 'jobs': '{}'".format( jobs ) )
+        return defaultJobCount()
+
+    return max( 1, jobs )
+
+
+def mapParallel( func, items, jobs=1 ):
+    """Call @p func for each item in @p items in up to @p jobs worker threads.
+
+    The results are returned in the same order as the items.  An exception
+    raised in a worker is re-raised after all the workers are finished.
+    """
+    items = list(items)
+    results = [ None ] * len(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [ func( item ) for item in items ]
+
+    lock = threading.Lock()
+    nextItem = [ 0 ]
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                if nextItem[0] >= len(items) or len(errors) > 0:
+                    return
+                i = nextItem[0]
+                nextItem[0] += 1
+            try:
+                results[i] = func( items[i] )
+            except Exception as e:
+                with lock:
+                    errors.append( e )
+
+    threads = [ threading.Thread( target=worker ) for _ in range( min(jobs, len(items)) ) ]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for t in threads:
+        t.join()
+
+    if len(errors) > 0:
+        raise errors[0]
+
+    return results
@@ -0,0 +1,65 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import time
+import threading
+import unittest
+from workerpool import mapParallel, getJobCount
+from testsupport import TestConfig
+
+class TestMapParallel(unittest.TestCase):
+    def test_resultsKeepOrder(self):
+        # The first items finish last.
+        def func( i ):
+            time.sleep( 0.01 * (5 - i) )
+            return i * i
+        self.assertEqual( mapParallel( func, range(6), 4 ), [ 0, 1, 4, 9, 16, 25 ] )
+
+    def test_serialRun(self):
+        threads = set()
+        def func( i ):
+            threads.add( threading.current_thread() )
+            return i
+        self.assertEqual( mapParallel( func, range(3), 1 ), [ 0, 1, 2 ] )
+        self.assertEqual( threads, set([ threading.current_thread() ]) )
+
+    def test_firstErrorIsRaised(self):
+        started = []
+        lock = threading.Lock()
+        def func( i ):
+            with lock:
+                started.append( i )
+            if i == 1:
+                raise ValueError( "item {}".format( i ) )
+            time.sleep( 0.01 )
+            return i
+
+        try:
+            mapParallel( func, range(20), 2 )
+            self.fail( "The error was not raised." )
+        except ValueError as e:
+            self.assertEqual( str(e), "item 1" )
+        # The workers stop taking items after the error.
+        self.assertTrue( len(started) < 20 )
+
+class TestJobCount(unittest.TestCase):
+    def test_jobCount(self):
+        self.assertEqual( getJobCount( TestConfig( { "jobs": "3" } ) ), 3 )
+        self.assertEqual( getJobCount( TestConfig( { "jobs": 0 } ) ), 1 )
+        self.assertTrue( getJobCount( TestConfig( { "jobs": "all" } ) ) >= 1 )
+
+if __name__ == "__main__":
+    unittest.main()
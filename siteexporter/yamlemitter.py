@@ -0,0 +1,56 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import yaml
+
+from sharedemitter import SharedValueEmitter
+
+# Use the libyaml emitter if it is available.
+YamlDumper = getattr( yaml, "CSafeDumper", yaml.SafeDumper )
+
+
+def dumpYaml( data ):
+    return yaml.dump( data, Dumper=YamlDumper, default_flow_style=False )
+
+
+def _indent( text, prefix ):
+    return "".join( [ prefix + line for line in text.splitlines( True ) ] )
+
+
+class SharedYamlEmitter( SharedValueEmitter ):
+    """Serialize the extra attributes of pages into the 'sx' YAML block."""
+
+    def dump( self, extraAttrs ):
+        own = {}
+        shared = []
+        for k,v in extraAttrs.items():
+            if k in self.sharedKeys and v is not None:
+                shared.append( k )
+            else:
+                own[k] = v
+
+        parts = [ "sx:\n" ]
+        if len(own) > 0:
+            parts.append( _indent( dumpYaml( own ), "  " ) )
+        for k in sorted( shared ):
+            parts.append( self._getSharedText( k, extraAttrs[k] ) )
+
+        if len(parts) == 1:
+            return dumpYaml( { "sx": {} } )
+        return "".join( parts )
+
+    def _dumpShared( self, key, value ):
+        return _indent( dumpYaml( { key: value } ), "  " )
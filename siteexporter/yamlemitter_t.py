@@ -0,0 +1,43 @@
+# vim: set fileencoding=utf-8 sw=4 sts=4 ts=8 et :vim
+# Zim Plugin - Site Exporter
+# Copyright (C) 2018 Marko Mahnič
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+import yaml
+from yamlemitter import SharedYamlEmitter
+
+class TestSharedYamlEmitter(unittest.TestCase):
+    def test_dumpIsValidYaml(self):
+        tr = { "news-archive": "Archive" }
+        navindex = [ { "id": "a", "link": "a.html", "items": [ { "id": "a:b", "link": "a/b.html" } ] } ]
+        attrs = { "title": "Title: a", "tr": tr, "navindex": navindex, "news-pagination": { "page": 1 } }
+        emitter = SharedYamlEmitter()
+        self.assertEqual( yaml.safe_load( emitter.dump( attrs ) ), { "sx": attrs } )
+
+    def test_sharedValuesAreReused(self):
+        tr = { "news-archive": "Archive" }
+        emitter = SharedYamlEmitter()
+        first = emitter.dump( { "title": "a", "tr": tr } )
+        second = emitter.dump( { "title": "b", "tr": tr } )
+        self.assertEqual( emitter.hits, 1 )
+        self.assertEqual( yaml.safe_load( second ), { "sx": { "title": "b", "tr": tr } } )
+        self.assertEqual( first.replace( "title: a", "title: b" ), second )
+
+    def test_dumpEmpty(self):
+        emitter = SharedYamlEmitter()
+        self.assertEqual( yaml.safe_load( emitter.dump( {} ) ), { "sx": {} } )
+
+if __name__ == "__main__":
+    unittest.main()